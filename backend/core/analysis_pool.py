@@ -0,0 +1,389 @@
+"""
+FILE: analysis_pool.py
+PURPOSE: Runs engine.analyze() in a pool of worker processes, so sentiment
+         scoring (pure Python, holds the GIL) can use every CPU core.
+NOTES:
+- Each worker loads TextBlob once when it starts (warm_up), not per request
+- Workers come from a fork server where the platform has one: the server
+  process is already running threads (state flush, file watchers, log
+  writer) by the time the pool starts, and a plain fork would copy their
+  locks in whatever state they were in
+- A job whose worker died while it was in flight is submitted once more,
+  to a fresh pool
+- submit()/analyze() for single entries (/process), map() for batch jobs
+- Backpressure: at most max_pending jobs may be queued or running. A new
+  job waits up to queue_timeout seconds for a slot, then PoolSaturated is
+  raised (queue_timeout=0 rejects straight away)
+- workers=0 runs everything in the calling process (CLI, debugging)
+- Each worker's stage timings and cache counters come back with every
+  chunk and are merged into this process's METRICS (/metrics)
+- Jobs can name the lexicon to scan with (the one the crisis firewall just
+  used). Workers hot-reload lexicon.json on their own, so a worker holding
+  another version reloads once; if it still differs (the file changed
+  again) the job runs in the calling process with the caller's lexicon
+"""
+
+import multiprocessing
+import os
+import signal
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from engine import analyze_batch, warm_up
+from lexicon import LEXICON
+from logs import get_logger
+from metrics import METRICS
+
+
+LOG = get_logger("analysis_pool")
+
+# Worker processes (0 = analyze in the calling process)
+ANALYSIS_WORKERS = int(os.environ.get("INNERVERSE_ANALYSIS_WORKERS", str(os.cpu_count() or 1)))
+
+# Jobs allowed to be queued or running before new ones have to wait
+MAX_PENDING = int(os.environ.get("INNERVERSE_ANALYSIS_QUEUE", str(max(1, ANALYSIS_WORKERS) * 8)))
+
+# Seconds a new job waits for a free slot before being rejected (0 = reject at once)
+QUEUE_TIMEOUT = float(os.environ.get("INNERVERSE_ANALYSIS_WAIT", "2.0"))
+
+# Entries sent to a worker per task in map()
+BATCH_CHUNK = 32
+
+
+class PoolSaturated(Exception):
+    """Every slot in the pool is taken and the job could not wait any longer."""
+
+
+class LexiconMismatch(Exception):
+    """A worker couldn't load the lexicon version the job asked for."""
+
+
+# ============================================================
+# WORKER SIDE
+# ============================================================
+
+def _init_worker():
+    # CTRL+C is the parent's job; workers are shut down through the executor
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    warm_up()
+    # Only report what happens in this worker from here on (warm_up's
+    # timings are startup, not requests)
+    METRICS.reset()
+
+
+def _analyze_chunk(texts, lexicon=None):
+    return list(analyze_batch(texts, lexicon))
+
+
+def _analyze_chunk_in_worker(texts, lexicon_key=None):
+    return _analyze_chunk(texts, _worker_lexicon(lexicon_key)), METRICS.drain()
+
+
+def _worker_lexicon(key):
+    """This worker's Lexicon with digest `key` (None: the one in force)."""
+    if key is None:
+        return None
+    lexicon = LEXICON.current
+    if lexicon.key != key:
+        # The server reloaded lexicon.json before this worker's watcher did
+        LEXICON.reload()
+        lexicon = LEXICON.current
+        if lexicon.key != key:
+            raise LexiconMismatch(f"worker has lexicon {lexicon.version}")
+    return lexicon
+
+
+# ============================================================
+# POOL
+# ============================================================
+
+class AnalysisPool:
+    """Process pool for analyze() with a bounded number of pending jobs."""
+
+    def __init__(self, workers=ANALYSIS_WORKERS, max_pending=MAX_PENDING, queue_timeout=QUEUE_TIMEOUT):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._counts_lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def start(self):
+        """
+        Starts the worker processes now instead of on the first job.
+        Safe from any thread: workers never fork the calling process
+        directly (see _mp_context()).
+        """
+        if self.workers > 0:
+            self._get_executor()
+        return self
+
+    def close(self):
+        """Waits for running jobs and stops the workers."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    # --------------------------------------------------------
+    # Jobs
+    # --------------------------------------------------------
+
+    def submit(self, user_text, timeout=None, lexicon=None):
+        """
+        Queues one entry for analysis.
+
+        Args:
+            user_text: The journal entry
+            timeout: Seconds to wait for a free slot (default: queue_timeout;
+                     a queue_timeout of None waits as long as it takes)
+            lexicon: The lexicon.Lexicon to scan with (default: the worker's)
+
+        Returns:
+            Future: Resolves to an engine.Analysis, or fails with
+                    LexiconMismatch (analyze() handles that itself)
+
+        Raises:
+            PoolSaturated: If no slot became free in time
+        """
+        wait = self.queue_timeout if timeout is None else timeout
+        return _first_result(self._submit([user_text], wait, lexicon))
+
+    def analyze(self, user_text, timeout=None, lexicon=None):
+        """submit() and wait for the result."""
+        wait = self.queue_timeout if timeout is None else timeout
+        return self._results([user_text], self._submit([user_text], wait, lexicon), wait, lexicon)[0]
+
+    def map(self, texts, chunksize=BATCH_CHUNK, lexicon=None):
+        """
+        Analyzes many entries across all workers (backfills, re-scoring).
+
+        Batch jobs never get rejected; they wait for free slots, and only a
+        couple of chunks per worker are in flight at once so interactive
+        requests still get through.
+
+        Args:
+            lexicon: The lexicon.Lexicon to scan with (default: the workers')
+
+        Yields:
+            Analysis: One result per text, in order
+        """
+        in_flight = deque()
+        limit = max(1, self.workers) * 2
+
+        def results(job):
+            chunk, future = job
+            return self._results(chunk, future, None, lexicon)
+
+        chunk = []
+        for text in texts:
+            chunk.append(text)
+            if len(chunk) == chunksize:
+                in_flight.append((chunk, self._submit(chunk, None, lexicon)))
+                chunk = []
+                while len(in_flight) >= limit:
+                    yield from results(in_flight.popleft())
+        if chunk:
+            in_flight.append((chunk, self._submit(chunk, None, lexicon)))
+
+        while in_flight:
+            yield from results(in_flight.popleft())
+
+    def stats(self):
+        """Returns the pool's configuration and job counters."""
+        with self._counts_lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected
+            }
+
+    # --------------------------------------------------------
+    # Internals
+    # --------------------------------------------------------
+
+    def _results(self, texts, future, wait, lexicon, retry=True):
+        """
+        Waits for a chunk queued by _submit(). Runs it here if the worker's
+        lexicon didn't match, and submits it once more if its worker died.
+        """
+        try:
+            return future.result()
+        except LexiconMismatch:
+            return _analyze_chunk(texts, lexicon)
+        except BrokenProcessPool:
+            if not retry:
+                raise
+            # The dead pool is replaced by the next submit (_submit_to_executor)
+            return self._results(texts, self._submit(texts, wait, lexicon), wait, lexicon, retry=False)
+
+    def _submit(self, texts, wait, lexicon=None):
+        """Takes a slot (waiting up to `wait` seconds, None = forever) and queues a chunk."""
+        if not self._slots.acquire(timeout=wait):
+            with self._counts_lock:
+                self._rejected += 1
+            raise PoolSaturated(f"{self.max_pending} analysis jobs already pending")
+
+        with self._counts_lock:
+            self._pending += 1
+
+        try:
+            if self.workers <= 0:
+                future = Future()
+                future.set_result(_analyze_chunk(texts, lexicon))
+            else:
+                # Workers have their own copy of the lexicon; send its digest
+                future = self._submit_to_executor(texts, None if lexicon is None else lexicon.key)
+        except BaseException:
+            with self._counts_lock:
+                self._pending -= 1
+            self._slots.release()
+            raise
+
+        future.add_done_callback(self._release)
+        return future
+
+    def _submit_to_executor(self, texts, lexicon_key):
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_analyze_chunk_in_worker, texts, lexicon_key)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed by the OS); start a fresh pool once
+            LOG.warning("analysis_worker_died", action="restarting pool")
+            with self._executor_lock:
+                # Another thread may have replaced it already
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+            future = self._get_executor().submit(_analyze_chunk_in_worker, texts, lexicon_key)
+        return _merged_metrics(future)
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=_mp_context(),
+                    initializer=_init_worker
+                )
+                # Workers are launched on the first job
+                self._executor.submit(os.getpid).result()
+            return self._executor
+
+    def _release(self, _future):
+        # Done callback: the job finished (or failed), so its slot is free again
+        with self._counts_lock:
+            self._pending -= 1
+            self._completed += 1
+        self._slots.release()
+
+
+def _mp_context():
+    # forkserver: workers are forked from a clean, single-threaded helper
+    # process, never from the server itself. Elsewhere the platform default
+    # (spawn re-imports modules in each worker).
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context()
+
+
+def _first_result(chunk_future):
+    """Turns a Future of [Analysis] into a Future of Analysis."""
+    future = Future()
+
+    def copy(done):
+        if done.cancelled():
+            future.cancel()
+        elif done.exception() is not None:
+            future.set_exception(done.exception())
+        else:
+            future.set_result(done.result()[0])
+
+    chunk_future.add_done_callback(copy)
+    return future
+
+
+def _merged_metrics(worker_future):
+    """Turns a Future of ([Analysis], drained metrics) into a Future of [Analysis]."""
+    future = Future()
+
+    def copy(done):
+        if done.cancelled():
+            future.cancel()
+        elif done.exception() is not None:
+            future.set_exception(done.exception())
+        else:
+            results, drained = done.result()
+            METRICS.merge(drained)
+            future.set_result(results)
+
+    worker_future.add_done_callback(copy)
+    return future
+
+
+def is_worker_process():
+    """True inside a pool worker (or any multiprocessing child)."""
+    return multiprocessing.parent_process() is not None
+
+
+# ============================================================
+# TESTING INTERFACE
+# ============================================================
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from engine import analyze
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    samples = [
+        "I am so angry about everything that happened today",
+        "Feeling really happy and grateful for my friends",
+        "I can't breathe, everything is too much and I'm overwhelmed",
+        "Quiet day. Read a book and went for a walk.",
+        "Stressed about exams but trying to stay calm",
+    ]
+    # Distinct texts, so the sentiment cache doesn't hide the work
+    texts = [f"{samples[i % len(samples)]} (entry {i})" for i in range(count)]
+
+    print("=" * 60)
+    print("    ANALYSIS POOL - THROUGHPUT")
+    print("=" * 60)
+
+    warm_up()
+    start = time.perf_counter()
+    expected = [analyze(text) for text in texts]
+    single = time.perf_counter() - start
+    print(f"In-process:          {count / single:8.0f} entries/s")
+
+    pool = AnalysisPool().start()
+    start = time.perf_counter()
+    results = list(pool.map(texts))
+    pooled = time.perf_counter() - start
+    print(f"Pool ({pool.workers} workers):   {count / pooled:8.0f} entries/s  ({single / pooled:.1f}x)")
+    print(f"Same results: {results == expected}")
+
+    # Backpressure: a tiny queue that rejects immediately
+    tight = AnalysisPool(workers=1, max_pending=2, queue_timeout=0).start()
+    futures, rejected = [], 0
+    for text in texts[:50]:
+        try:
+            futures.append(tight.submit(text))
+        except PoolSaturated:
+            rejected += 1
+    for future in futures:
+        future.result()
+    print(f"Tight pool: {len(futures)} accepted, {rejected} rejected -> {tight.stats()}")
+
+    tight.close()
+    pool.close()
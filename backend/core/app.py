@@ -6,32 +6,79 @@ FIXED ISSUES:
 - Added state persistence to JSON file
 - Improved error handling
 - Added proper cooling logic
+- House state is now kept per user in memory (see state_store.py)
+- Analysis runs in a pool of worker processes (see analysis_pool.py),
+  started on the first request rather than at import
+- Stage timings and counters are served at /metrics (see metrics.py)
+- Errors go to the structured log (see logs.py), not stdout
+- The crisis firewall (security.py) is the first stage of /process: crisis
+  entries get the resource payload and skip analysis and the house state
+- Heat cools with time (engine.decayed_heat), read by GET /state
 """
 
-from flask import Flask, render_template, request, jsonify
 import json
-from pathlib import Path
-from engine import analyze_journal_entry, detect_intent, translate_score_to_weather
+import os
+import threading
+from flask import Flask, Response, render_template, request, jsonify
+from engine import apply_thermal_logic, decayed_heat, warm_up
+from analysis_pool import AnalysisPool, PoolSaturated, is_worker_process
+from logs import dropped_records, get_logger
+from metrics import METRICS
+from lexicon import LEXICON
+from security import check_for_crisis, crisis_body
+from state_store import HouseStateStore, DEFAULT_USER
 
 app = Flask(__name__)
+LOG = get_logger("app")
 
-# State file for persistence across server restarts
-STATE_FILE = Path("house_state.json")
+# Pre-fork servers (e.g. gunicorn --preload) set this so the master process
+# loads TextBlob once and every worker starts warm
+if os.environ.get("INNERVERSE_WARM_UP") == "1":
+    warm_up()
 
-def load_state():
-    """Load the current house state from file."""
-    if STATE_FILE.exists():
-        try:
-            with open(STATE_FILE, 'r') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return {"heat": 0.0}
-    return {"heat": 0.0}
+# Analysis worker processes, started by start_workers(). Starting them at
+# import would give whatever imported this module a pool of its own (a
+# pre-fork server's master, the benchmarks)
+POOL = AnalysisPool()
+_workers_started = False
+_startup_lock = threading.Lock()
+
+# Per-user house state, kept in memory and flushed to disk in the background.
+# Heat cools off between entries; it is worked out whenever it is read.
+# Pool workers re-import this module when it is the main script
+# (python app.py); they never serve requests, so they don't flush
+STATE = HouseStateStore(decay=decayed_heat)
+if not is_worker_process():
+    STATE.start()
+
+METRICS.gauge("analysis_pending", "Analysis jobs queued or running", lambda: POOL.stats()["pending"])
+METRICS.gauge("analysis_rejected", "Analysis jobs rejected because the pool was full",
+              lambda: POOL.stats()["rejected"])
+METRICS.gauge("log_dropped", "Log records dropped because the log queue was full", dropped_records)
+
+
+def get_user_id(data=None):
+    """Identify whose house this request is for (body or query 'user_id', or X-User-Id header)."""
+    user_id = ((data or {}).get('user_id') or request.args.get('user_id')
+               or request.headers.get('X-User-Id') or DEFAULT_USER)
+    return str(user_id)[:128]
+
+
+@app.before_request
+def start_workers():
+    """
+    Starts the analysis workers on the first request. Servers that prefer
+    to pay for it up front can call this from their own startup hook
+    (e.g. gunicorn's post_worker_init); later calls do nothing.
+    """
+    global _workers_started
+    if _workers_started:
+        return
+    with _startup_lock:
+        if not _workers_started:
+            POOL.start()
+            _workers_started = True
 
-def save_state(heat):
-    """Save the current house state to file."""
-    with open(STATE_FILE, 'w') as f:
-        json.dump({"heat": heat}, f)
 
 @app.route('/')
 def home():
@@ -42,16 +89,27 @@ def home():
 def process():
     """
     Process the user's journal entry and return the atmosphere state.
-    Returns JSON with: score, intent, weather, heat_level
+    Returns JSON with: score, intent, weather, heat_level, lexicon_version
+    
+    Crisis entries return security.CRISIS_RESPONSE instead ("crisis": true,
+    message and resources) and leave the house untouched.
+    
+    lexicon_version is the version of lexicon.json the entry was read with
+    (lexicon.json is hot-reloaded; see lexicon.py).
     """
+    with METRICS.time("request"):
+        response, status = _process()
+    METRICS.count("responses", status)
+    return response, status
+
+def _process():
+    """/process itself; returns (response, status)."""
     try:
-        # Load current state
-        state = load_state()
-        current_heat = state["heat"]
-        
         # Get user input
         data = request.json
-        user_text = data.get('text', '').strip()
+        text = data.get('text')
+        user_text = text.strip() if isinstance(text, str) else ''
+        user_id = get_user_id(data)
         
         if not user_text:
             return jsonify({
@@ -59,55 +117,54 @@ def process():
                 "score": 0,
                 "intent": None,
                 "weather": "FOGGY MIST",
-                "heat_level": current_heat
+                "heat_level": STATE.get(user_id)["heat"]
             }), 400
         
-        # Analyze the text
-        score = analyze_journal_entry(user_text)
-        intent = detect_intent(user_text)
-        
-        # --- THERMAL LOGIC (Heat represents intensity/distress) ---
-        
-        # INSTANT HEAT TRIGGERS
-        if intent == "ANGER":
-            current_heat = 1.0  # Instant lava
-        elif intent == "OVERWHELMED":
-            current_heat = min(1.0, current_heat + 0.5)  # Rapid heating
-        
-        # COOLING LOGIC (Positive emotions cool the house)
-        elif intent in ["JOY", "GRATITUDE", "EXCITEMENT"]:
-            current_heat = max(0.0, current_heat - 0.4)  # Fast cooling
-        elif score > 0.3:
-            current_heat = max(0.0, current_heat - 0.3)  # Moderate cooling
-        
-        # SLOW COOLING (Neutral or slightly negative)
-        elif score > -0.2:
-            current_heat = max(0.0, current_heat - 0.1)  # Gentle cooling
-        
-        # HEATING (Negative emotions)
-        elif score < -0.5:
-            current_heat = min(1.0, current_heat + 0.3)  # Heating up
+        # SAFETY FIREWALL: runs before anything else. Crisis text never
+        # reaches sentiment analysis, weather mapping or the house state.
+        lexicon = LEXICON.current
+        if check_for_crisis(user_text, lexicon):
+            METRICS.count("firewall", "crisis")
+            return Response(crisis_body(lexicon.version), mimetype='application/json'), 200
+        METRICS.count("firewall", "clear")
         
-        # Natural decay over time (house slowly cools)
-        current_heat = max(0.0, current_heat - 0.05)
+        # Analyze the text in a worker process (every stage runs once), with
+        # the lexicon the firewall just used
+        try:
+            with METRICS.time("analysis"):
+                analysis = POOL.analyze(user_text, lexicon=lexicon)
+        except PoolSaturated:
+            response = jsonify({
+                "error": "Server busy, please try again",
+                "score": 0,
+                "intent": None,
+                "weather": "FOGGY MIST",
+                "heat_level": STATE.get(user_id)["heat"]
+            })
+            response.headers['Retry-After'] = '1'
+            return response, 503
         
-        # Get the weather state
-        weather = translate_score_to_weather(score, user_text)
+        # Update this user's heat (in memory; written to disk in the background)
+        with METRICS.time("state_update"):
+            current_heat = STATE.update(
+                user_id, lambda heat: apply_thermal_logic(heat, analysis.intent, analysis.score)
+            )
         
-        # Save the updated state
-        save_state(current_heat)
+        METRICS.count("intent", analysis.intent or "NONE")
+        METRICS.count("weather", analysis.weather)
         
         # Return the atmosphere data
         return jsonify({
-            "score": round(score, 2),
-            "intent": intent,
-            "weather": weather,
-            "heat_level": round(current_heat, 2)
-        })
+            "score": round(analysis.score, 2),
+            "intent": analysis.intent,
+            "weather": analysis.weather,
+            "heat_level": round(current_heat, 2),
+            "lexicon_version": analysis.lexicon_version
+        }), 200
     
     except Exception as e:
-        # Log the error (in production, use proper logging)
-        print(f"Error processing request: {str(e)}")
+        # Exception type and traceback only: the message may quote the entry
+        LOG.error("process_failed", error=type(e).__name__, exc_info=True)
         return jsonify({
             "error": "Internal server error",
             "score": 0,
@@ -116,10 +173,69 @@ def process():
             "heat_level": 0.0
         }), 500
 
+@app.route('/process/batch', methods=['POST'])
+def process_batch():
+    """
+    Analyze many journal entries in one call (history backfills and re-scoring).
+    Expects JSON {"texts": [...]} and streams back one JSON object per line
+    (NDJSON) with: index, score, intent, weather, lexicon_version
+    
+    Entries that aren't strings (null, numbers, ...) count as empty text,
+    as in /process. Entries the crisis firewall intercepts are not analyzed; their line is
+    {"index", "crisis": true, "lexicon_version"} instead.
+    
+    This does not touch the house heat.
+    """
+    data = request.get_json(silent=True) or {}
+    texts = data.get('texts')
+    
+    if not isinstance(texts, list):
+        return jsonify({"error": "Expected a list of texts"}), 400
+    
+    # Same rule as /process: anything but a string is no text
+    texts = [text if isinstance(text, str) else "" for text in texts]
+    lexicon = LEXICON.current  # one version for the whole batch
+    
+    def generate():
+        # SAFETY FIREWALL per entry, as in /process: flagged entries are never analyzed
+        crisis = [check_for_crisis(text, lexicon) for text in texts]
+        METRICS.count("firewall", "crisis", sum(crisis))
+        METRICS.count("firewall", "clear", len(texts) - sum(crisis))
+        results = POOL.map([text for text, flagged in zip(texts, crisis) if not flagged], lexicon=lexicon)
+        for index, flagged in enumerate(crisis):
+            if flagged:
+                yield json.dumps({"index": index, "crisis": True, "lexicon_version": lexicon.version}) + "\n"
+                continue
+            result = next(results)
+            yield json.dumps({
+                "index": index,
+                "score": round(result.score, 2),
+                "intent": result.intent,
+                "weather": result.weather,
+                "lexicon_version": result.lexicon_version
+            }) + "\n"
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/state')
+def state():
+    """
+    Current heat of a house, cooled down to now. Read-only: no analysis,
+    no disk access.
+    Returns JSON with: heat_level, updated_at
+    """
+    current = STATE.get(get_user_id())
+    return jsonify({"heat_level": round(current["heat"], 2), "updated_at": current["updated_at"]})
+
+@app.route('/metrics')
+def metrics():
+    """Stage latencies, intent/weather counts and cache hit rates (Prometheus text format)."""
+    return Response(METRICS.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/reset', methods=['POST'])
 def reset():
     """Reset the house state to default."""
-    save_state(0.0)
+    STATE.set(get_user_id(request.get_json(silent=True)), 0.0)
     return jsonify({"message": "House reset successfully", "heat_level": 0.0})
 
 if __name__ == '__main__':
@@ -129,4 +245,5 @@ if __name__ == '__main__':
     print("📍 Visit: http://127.0.0.1:5000")
     print("💡 Press CTRL+C to stop the server")
     print("=" * 50)
+    warm_up()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,447 @@
+"""
+FILE: asgi.py
+PURPOSE: Async (ASGI) version of the app.py API, so one process can hold
+         thousands of idle frontend connections open.
+USAGE:
+    cd backend/core
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+NOTES:
+- Same /process, /state, /reset and /metrics contract as the Flask app,
+  crisis firewall and heat decay included
+- /live (WebSocket): the weather and heat follow the entry while it is
+  typed; see live_session() for the messages
+- TextBlob analysis runs in a bounded thread pool, never on the event loop;
+  when every slot is busy, new requests wait their turn
+- House state lives in memory (state_store.py); its disk writes happen on
+  the store's own background thread
+- Written against the bare ASGI spec, so no web framework is needed
+"""
+
+import asyncio
+import functools
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from engine import analyze, apply_thermal_logic, decayed_heat, warm_up
+from lexicon import LEXICON
+from live import Debouncer, LiveDraft
+from logs import get_logger
+from metrics import METRICS
+from security import CRISIS_RESPONSE, check_for_crisis, crisis_body
+from state_store import HouseStateStore, DEFAULT_USER
+
+LOG = get_logger("asgi")
+
+
+# Threads available for analysis, and how many analyses may be queued or
+# running at once before new requests have to wait
+ANALYSIS_THREADS = int(os.environ.get("INNERVERSE_ANALYSIS_THREADS", "4"))
+MAX_PENDING = int(os.environ.get("INNERVERSE_MAX_PENDING", "64"))
+
+# Largest request body accepted (bytes)
+MAX_BODY = 1024 * 1024
+
+class BodyTooLarge(Exception):
+    """The request body is over MAX_BODY bytes."""
+
+
+EXECUTOR = ThreadPoolExecutor(max_workers=ANALYSIS_THREADS, thread_name_prefix="analysis")
+STATE = None  # created at startup, off the event loop
+_pending = None
+_startup_lock = asyncio.Lock()
+
+
+# ============================================================
+# ROUTES
+# ============================================================
+
+async def process(request):
+    """
+    Process the user's journal entry and return the atmosphere state.
+    Returns JSON with: score, intent, weather, heat_level, lexicon_version
+    (or security.CRISIS_RESPONSE, like app.py)
+    """
+    try:
+        data = request["json"]
+        # null, numbers, lists...: no text, not their str()
+        text = data.get("text")
+        user_text = text.strip() if isinstance(text, str) else ""
+        user_id = _user_id(request)
+
+        if not user_text:
+            return 400, {
+                "error": "No text provided",
+                "score": 0,
+                "intent": None,
+                "weather": "FOGGY MIST",
+                "heat_level": STATE.get(user_id)["heat"]
+            }
+
+        # Safety firewall first: crisis text skips analysis and the house state
+        lexicon = LEXICON.current
+        if check_for_crisis(user_text, lexicon):
+            METRICS.count("firewall", "crisis")
+            return 200, crisis_body(lexicon.version)
+        METRICS.count("firewall", "clear")
+
+        # CPU-bound: run in the analysis pool, at most MAX_PENDING at a time,
+        # with the lexicon the firewall just used
+        with METRICS.time("analysis"):
+            analysis = await _run_analysis(lambda: analyze(user_text, lexicon=lexicon))
+
+        # Memory only; flushed to disk by the store's background thread
+        with METRICS.time("state_update"):
+            current_heat = STATE.update(
+                user_id, lambda heat: apply_thermal_logic(heat, analysis.intent, analysis.score)
+            )
+
+        METRICS.count("intent", analysis.intent or "NONE")
+        METRICS.count("weather", analysis.weather)
+
+        return 200, {
+            "score": round(analysis.score, 2),
+            "intent": analysis.intent,
+            "weather": analysis.weather,
+            "heat_level": round(current_heat, 2),
+            "lexicon_version": analysis.lexicon_version
+        }
+
+    except Exception as e:
+        LOG.error("process_failed", error=type(e).__name__, exc_info=True)
+        return 500, {
+            "error": "Internal server error",
+            "score": 0,
+            "intent": None,
+            "weather": "FOGGY MIST",
+            "heat_level": 0.0
+        }
+
+
+async def state(request):
+    """Current heat of a house, cooled down to now (read-only, memory only)."""
+    current = STATE.get(_user_id(request))
+    return 200, {"heat_level": round(current["heat"], 2), "updated_at": current["updated_at"]}
+
+
+async def metrics(request):
+    """Stage latencies, intent/weather counts and cache hit rates (Prometheus text format)."""
+    return 200, METRICS.render()
+
+
+async def reset(request):
+    """Reset the house state to default."""
+    STATE.set(_user_id(request), 0.0)
+    return 200, {"message": "House reset successfully", "heat_level": 0.0}
+
+
+async def live_session(socket):
+    """
+    Live updates while the user types (WebSocket /live?user_id=...).
+
+    Client -> server (JSON text frames):
+        {"type": "delta", "pos": 12, "delete": 0, "insert": "abc"}
+            (see live.LiveDraft for the delta forms)
+        {"type": "commit"}  the entry is finished: apply its heat for real
+        {"type": "reset"}   start a new, empty draft
+
+    Server -> client:
+        {"type": "update", "score", "intent", "weather", "heat_level", "lexicon_version"}
+            debounced; heat_level is a preview and is not saved. No update
+            is sent while the draft trips the crisis firewall
+        {"type": "committed", "score", "intent", "weather", "heat_level", "lexicon_version"}
+        {"type": "crisis", "message", "resources", ...}
+            sent instead of "committed" when the firewall intercepts the
+            entry (see security.CRISIS_RESPONSE); the heat is not changed
+        {"type": "error", "error": "..."}
+    """
+    user_id = socket.user_id
+    draft = LiveDraft()
+    debounce = Debouncer()
+    last_update = None
+
+    def preview():
+        # Same firewall as a commit: a crisis draft gets no weather preview
+        if check_for_crisis(draft.text, draft.lexicon):
+            return None
+        return draft.analyze()
+
+    while True:
+        message = await socket.receive(timeout=debounce.due_in())
+
+        if message is None:
+            # Typing paused (or has gone on for MAX_DELAY): send an update
+            debounce.reset()
+            analysis = await _run_analysis(preview)
+            if analysis is None:
+                last_update = None
+                continue
+            heat = apply_thermal_logic(STATE.get(user_id)["heat"], analysis.intent, analysis.score)
+            update = _atmosphere("update", analysis, heat)
+            if update != last_update:
+                await socket.send(update)
+                last_update = update
+            continue
+
+        if message.get("type") == "disconnect":
+            return
+
+        kind = message.get("type", "delta")
+        try:
+            if kind == "delta":
+                draft.apply(message)
+                debounce.touch()
+            elif kind == "commit" and check_for_crisis(draft.text, draft.lexicon):
+                await socket.send(dict(CRISIS_RESPONSE, type="crisis", lexicon_version=draft.lexicon.version))
+                draft, last_update = LiveDraft(), None
+                debounce.reset()
+            elif kind == "commit":
+                analysis = await _run_analysis(draft.analyze)
+                heat = STATE.update(
+                    user_id, lambda heat: apply_thermal_logic(heat, analysis.intent, analysis.score)
+                )
+                await socket.send(_atmosphere("committed", analysis, heat))
+                draft, last_update = LiveDraft(), None
+                debounce.reset()
+            elif kind == "reset":
+                draft, last_update = LiveDraft(), None
+                debounce.reset()
+            elif kind == "invalid":
+                raise ValueError("Messages must be JSON objects")
+            else:
+                raise ValueError(f"Unknown message type: {kind}")
+        except ValueError as e:
+            await socket.send({"type": "error", "error": str(e)})
+
+
+ROUTES = {
+    ("POST", "/process"): process,
+    ("POST", "/reset"): reset,
+    ("GET", "/state"): state,
+    ("GET", "/metrics"): metrics,
+}
+
+WEBSOCKET_ROUTES = {
+    "/live": live_session,
+}
+
+
+# ============================================================
+# ASGI PLUMBING
+# ============================================================
+
+async def app(scope, receive, send):
+    """The ASGI application callable."""
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+
+    if scope["type"] not in ("http", "websocket"):
+        return
+
+    if STATE is None:
+        # Server without lifespan support: start up on the first request
+        async with _startup_lock:
+            if STATE is None:
+                await _startup()
+
+    if scope["type"] == "websocket":
+        await _websocket(scope, receive, send)
+        return
+
+    handler = ROUTES.get((scope["method"], scope["path"]))
+    if handler is None:
+        await _send_json(send, 404, {"error": "Not found"})
+        return
+
+    try:
+        body = await _read_body(receive)
+        data = json.loads(body) if body else {}
+        if not isinstance(data, dict):
+            raise ValueError("Expected a JSON object")
+    except BodyTooLarge:
+        await _send_json(send, 413, {"error": "Request body too large"})
+        return
+    except ValueError:
+        await _send_json(send, 400, {"error": "Invalid JSON body"})
+        return
+
+    headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    request = {"json": data, "headers": headers, "query": query}
+    if handler is process:
+        with METRICS.time("request"):
+            status, payload = await handler(request)
+        METRICS.count("responses", status)
+    else:
+        status, payload = await handler(request)
+
+    if isinstance(payload, str):
+        await _send_text(send, status, payload)
+    else:
+        await _send_json(send, status, payload)
+
+
+async def _run_analysis(fn):
+    """Runs a CPU-bound analysis call in the pool, at most MAX_PENDING at a time."""
+    async with _pending:
+        return await asyncio.get_running_loop().run_in_executor(EXECUTOR, fn)
+
+
+async def _websocket(scope, receive, send):
+    handler = WEBSOCKET_ROUTES.get(scope["path"])
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    if handler is None:
+        await send({"type": "websocket.close", "code": 1008})
+        return
+
+    await send({"type": "websocket.accept"})
+    socket = _WebSocket(scope, receive, send)
+    try:
+        await handler(socket)
+    finally:
+        socket.stop()
+
+
+class _WebSocket:
+    """
+    JSON messages over an accepted ASGI WebSocket.
+
+    A background task reads incoming frames into a queue, so receive() can
+    time out (for debouncing) without losing a frame half-way through.
+    """
+
+    def __init__(self, scope, receive, send):
+        headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        self.user_id = str(
+            (query.get("user_id") or [None])[0] or headers.get("x-user-id") or DEFAULT_USER
+        )[:128]
+
+        self._send = send
+        self._inbox = asyncio.Queue()
+        self._closed = False
+        self._reader = asyncio.create_task(self._read(receive))
+
+    async def _read(self, receive):
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                await self._inbox.put({"type": "disconnect"})
+                return
+
+            raw = message.get("text")
+            if raw is None:
+                raw = (message.get("bytes") or b"").decode("utf-8", "replace")
+            try:
+                data = json.loads(raw)
+                if not isinstance(data, dict):
+                    raise ValueError("Expected a JSON object")
+            except ValueError:
+                data = {"type": "invalid"}
+            await self._inbox.put(data)
+
+    async def receive(self, timeout=None):
+        """Next message as a dict, or None if `timeout` seconds pass first."""
+        try:
+            return await asyncio.wait_for(self._inbox.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def send(self, payload):
+        if not self._closed:
+            await self._send({"type": "websocket.send", "text": json.dumps(payload)})
+
+    def stop(self):
+        self._closed = True
+        self._reader.cancel()
+
+
+def _atmosphere(kind, analysis, heat):
+    return {
+        "type": kind,
+        "score": round(analysis.score, 2),
+        "intent": analysis.intent,
+        "weather": analysis.weather,
+        "heat_level": round(heat, 2),
+        "lexicon_version": analysis.lexicon_version
+    }
+
+
+async def _startup():
+    global STATE, _pending
+    loop = asyncio.get_running_loop()
+
+    _pending = asyncio.Semaphore(MAX_PENDING)
+    # Reading shard files and loading TextBlob both block; keep them off the loop
+    store = await loop.run_in_executor(EXECUTOR, functools.partial(HouseStateStore, decay=decayed_heat))
+    store.start()
+    STATE = store
+    await loop.run_in_executor(EXECUTOR, warm_up)
+
+
+async def _shutdown():
+    if STATE is not None:
+        await asyncio.get_running_loop().run_in_executor(EXECUTOR, STATE.close)
+    EXECUTOR.shutdown(wait=False)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await _startup()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await _shutdown()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def _read_body(receive):
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if len(body) > MAX_BODY:
+            raise BodyTooLarge(f"Request body over {MAX_BODY} bytes")
+    return body
+
+
+async def _send_json(send, status, payload):
+    # bytes are JSON serialized in advance (security.crisis_body())
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_text(send, status, text):
+    body = text.encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"text/plain; version=0.0.4; charset=utf-8"),
+            (b"content-length", str(len(body)).encode("ascii")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def _user_id(request):
+    """Same rule as app.get_user_id: body or query 'user_id', then X-User-Id header."""
+    user_id = (request["json"].get("user_id") or (request["query"].get("user_id") or [None])[0]
+               or request["headers"].get("x-user-id") or DEFAULT_USER)
+    return str(user_id)[:128]
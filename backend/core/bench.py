@@ -0,0 +1,331 @@
+"""
+FILE: bench.py
+PURPOSE: Reproducible benchmarks for the emotion pipeline and the storage
+         layer, printed as JSON so runs from different commits can be compared.
+USAGE:
+    cd backend/core && python bench.py [options]
+    cd backend && python -m core.bench [options]
+
+    --quick               fewer runs and smaller journals (1k, 10k)
+    --sizes 1000,10000    journal sizes for the storage benchmarks
+    --backends json       storage backends to benchmark (json, sqlite)
+    --output FILE         also write the JSON report to FILE
+    --compare FILE        print the p50 change against an earlier report
+
+Every timing is in microseconds: mean, p50, p95, p99 and min over `runs`.
+Storage benchmarks run in a fresh process inside a temporary directory,
+so the real journal is never touched.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+# Imports in this package are flat (they run from backend/core); make that
+# work for `python -m core.bench` too
+CORE_DIR = os.path.dirname(os.path.abspath(__file__))
+if CORE_DIR not in sys.path:
+    sys.path.insert(0, CORE_DIR)
+
+
+SAMPLE_ENTRIES = [
+    "Today was a good day. I finally finished the project and I feel proud.",
+    "I am so angry right now, nobody listens to me!!!",
+    "Not a great week. Work was stressful and I barely slept.",
+    "I can't stop worrying about the exam tomorrow, I'm so nervous.",
+    "Had a lovely dinner with friends, really happy and grateful.",
+    "Everything feels heavy. I'm tired of being tired and I feel hopeless.",
+    "Quiet morning. Coffee, a book, some rain outside.",
+    "I'm overwhelmed, there's too much to do and not enough time. " * 4,
+]
+
+# Intercepted by the safety firewall in /process
+CRISIS_ENTRY = "I can't do this anymore, I want to end my life"
+
+WEATHERS = ["RADIANT SUN", "CLEAR SKIES", "FOGGY MIST", "STEADY RAIN", "THUNDERSTORM"]
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+QUICK_SIZES = [1_000, 10_000]
+
+
+# ============================================================
+# TIMING
+# ============================================================
+
+def measure(fn, runs, setup=None, warmup=3):
+    """
+    Times fn(i) for i in range(runs).
+
+    Args:
+        setup: Optional setup(i) run before each call, outside the timing
+
+    Returns:
+        dict: runs, mean, p50, p95, p99 and min in microseconds
+    """
+    for i in range(warmup):
+        if setup:
+            setup(i)
+        fn(i)
+
+    samples = []
+    for i in range(runs):
+        if setup:
+            setup(i)
+        start = time.perf_counter_ns()
+        fn(i)
+        samples.append((time.perf_counter_ns() - start) / 1000)
+
+    return summarize(samples)
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {
+        "runs": len(ordered),
+        "mean": round(statistics.fmean(ordered), 2),
+        "p50": round(percentile(50), 2),
+        "p95": round(percentile(95), 2),
+        "p99": round(percentile(99), 2),
+        "min": round(ordered[0], 2)
+    }
+
+
+def _text(i):
+    """A sample entry, made unique so caches don't answer for it."""
+    return f"{SAMPLE_ENTRIES[i % len(SAMPLE_ENTRIES)]} (day {i})"
+
+
+# ============================================================
+# PIPELINE
+# ============================================================
+
+def bench_pipeline(runs):
+    """Engine stages, one entry at a time."""
+    import engine
+    from security import check_for_crisis
+
+    engine.warm_up()
+    results = {}
+
+    results["detect_intent"] = measure(lambda i: engine.detect_intent(_text(i)), runs)
+
+    results["check_for_crisis"] = measure(lambda i: check_for_crisis(_text(i)), runs)
+
+    results["analyze_journal_entry"] = measure(
+        lambda i: engine.analyze_journal_entry(_text(i)), runs,
+        setup=lambda i: engine.invalidate_sentiment_cache()
+    )
+    results["analyze_journal_entry.cached"] = measure(
+        lambda i: engine.analyze_journal_entry(SAMPLE_ENTRIES[0]), runs
+    )
+    results["analyze"] = measure(
+        lambda i: engine.analyze(_text(i)), runs,
+        setup=lambda i: engine.invalidate_sentiment_cache()
+    )
+
+    return results
+
+
+def bench_flask(runs):
+    """The /process round trip through Flask's test client."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as flask_app
+
+    client = flask_app.app.test_client()
+
+    def post(i):
+        response = client.post("/process", json={"text": _text(i), "user_id": f"bench-{i % 50}"})
+        if response.status_code != 200:
+            raise RuntimeError(f"/process returned {response.status_code}")
+
+    results = {"process_roundtrip": measure(post, runs)}
+    results["process_roundtrip.cached"] = measure(
+        lambda i: client.post("/process", json={"text": SAMPLE_ENTRIES[0], "user_id": "bench"}), runs
+    )
+    results["process_roundtrip.crisis"] = measure(
+        lambda i: client.post("/process", json={"text": f"{CRISIS_ENTRY} ({i})", "user_id": "bench"}), runs
+    )
+
+    flask_app.STATE.close()
+    flask_app.POOL.close()
+    return results
+
+
+# ============================================================
+# STORAGE
+# ============================================================
+
+def bench_storage(backend, size, runs):
+    """
+    Runs _storage_case() in a fresh process (clean module state, own
+    temporary directory).
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(_storage_case, backend, size, runs).result()
+
+
+def _storage_case(backend, size, runs):
+    directory = tempfile.mkdtemp(prefix="innerverse_bench_")
+    try:
+        os.chdir(directory)
+        os.environ["INNERVERSE_STORAGE"] = backend
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            from utils import storage
+
+            _seed_journal(storage.FILE_PATH, size)
+            storage.rebuild_aggregates()
+            storage.get_backend()  # SQLite imports the seeded log here
+
+            results = {
+                "save_entry": measure(
+                    lambda i: storage.save_entry(WEATHERS[i % 5], 0.1, "benchmark entry"), runs
+                ),
+                "load_history": measure(
+                    lambda i: storage.load_history(), max(3, runs // 20), warmup=1
+                ),
+                "get_recent_entries": measure(lambda i: storage.get_recent_entries(5), runs),
+                "window_stats": measure(lambda i: storage.window_stats(7), max(3, runs // 4)),
+            }
+
+        results["entries_after"] = storage.get_entry_count()
+        return results
+    finally:
+        os.chdir(CORE_DIR)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _seed_journal(path, size):
+    """Writes `size` entries straight into the NDJSON log, one minute apart."""
+    start = datetime.now() - timedelta(minutes=size)
+    with open(path, "w", encoding="utf-8") as file:
+        for i in range(size):
+            entry = {
+                "timestamp": (start + timedelta(minutes=i)).isoformat(),
+                "weather": WEATHERS[i % 5],
+                "score": round((i % 21) / 10 - 1, 2),
+            }
+            file.write(json.dumps(entry) + "\n")
+
+
+# ============================================================
+# REPORT
+# ============================================================
+
+def run_all(sizes, backends, runs, storage_runs):
+    """
+    Runs every benchmark.
+
+    Returns:
+        dict: {"meta": {...}, "results": {name: timings}}
+    """
+    results = {}
+
+    # Flask's app module writes house state to the working directory
+    workdir = tempfile.mkdtemp(prefix="innerverse_bench_")
+    cwd = os.getcwd()
+    try:
+        os.chdir(workdir)
+        for name, timings in bench_pipeline(runs).items():
+            results[f"pipeline.{name}"] = timings
+        for name, timings in bench_flask(runs).items():
+            results[f"flask.{name}"] = timings
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for backend in backends:
+        for size in sizes:
+            case = bench_storage(backend, size, storage_runs)
+            for name, timings in case.items():
+                results[f"storage.{backend}.{size}.{name}"] = timings
+
+    return {"meta": _meta(runs, storage_runs), "results": results}
+
+
+def _meta(runs, storage_runs):
+    import engine
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=CORE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "sentiment_engine": engine.SENTIMENT_ENGINE,
+        "analysis_workers": os.environ.get("INNERVERSE_ANALYSIS_WORKERS", "default"),
+        "runs": runs,
+        "storage_runs": storage_runs,
+        "unit": "microseconds"
+    }
+
+
+def compare(report, baseline):
+    """
+    Lines comparing p50 times with an earlier report (ratio > 1 is slower).
+    """
+    lines = []
+    for name, timings in sorted(report["results"].items()):
+        old = baseline.get("results", {}).get(name)
+        if not isinstance(timings, dict) or not isinstance(old, dict) or not old.get("p50"):
+            continue
+        ratio = timings["p50"] / old["p50"]
+        flag = "  <-- slower" if ratio > 1.2 else ("  faster" if ratio < 0.8 else "")
+        lines.append(f"{name:55s} {old['p50']:>12.1f} -> {timings['p50']:>12.1f} us  x{ratio:.2f}{flag}")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Innerverse benchmarks (JSON output)")
+    parser.add_argument("--quick", action="store_true", help="fewer runs, journals up to 10k")
+    parser.add_argument("--sizes", help="comma-separated journal sizes")
+    parser.add_argument("--backends", default="json", help="comma-separated: json,sqlite")
+    parser.add_argument("--runs", type=int, help="timed calls per pipeline benchmark")
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--compare", help="earlier report to compare against")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")] if args.sizes else (
+        QUICK_SIZES if args.quick else DEFAULT_SIZES
+    )
+    runs = args.runs or (100 if args.quick else 500)
+    storage_runs = 50 if args.quick else 200
+    backends = [name.strip() for name in args.backends.split(",") if name.strip()]
+
+    report = run_all(sizes, backends, runs, storage_runs)
+    output = json.dumps(report, indent=2)
+    print(output)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        print("\n".join(compare(report, baseline)), file=sys.stderr)
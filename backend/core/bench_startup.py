@@ -0,0 +1,78 @@
+"""
+FILE: bench_startup.py
+PURPOSE: Measures how long it takes to import the engine and the Flask app,
+         using Python's own `-X importtime` report.
+USAGE:
+    cd backend/core
+    python bench_startup.py [runs]
+
+Prints JSON with the median cumulative import time (microseconds) for:
+- engine        : what every worker / CLI start pays now (TextBlob deferred)
+- engine_warm   : engine + warm_up(), i.e. the old eager-import cost
+- app           : the Flask app module
+- textblob, rich: the heavy libraries that are no longer imported up front
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+CORE_DIR = Path(__file__).resolve().parent
+
+
+SCENARIOS = {
+    "engine": ("import engine", "engine"),
+    "engine_warm": ("import engine; engine.warm_up()", None),
+    "app": ("import app", "app"),
+    "textblob": ("import textblob", "textblob"),
+    "rich": ("import rich.console, rich.panel, rich.table", None),
+}
+
+
+def run_once(code, module, workdir=None):
+    """
+    Runs `code` in a fresh interpreter with -X importtime, in `workdir`
+    (importing app writes house state to the working directory).
+
+    Returns:
+        int: Cumulative import time of `module` in microseconds, or the sum
+             of all top-level imports if module is None
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(CORE_DIR), env.get("PYTHONPATH")]))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True, cwd=workdir, env=env
+    )
+
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Top-level imports have no indentation after the "| " separator
+        if not name[1:].startswith(" "):
+            if module is None:
+                total += int(cumulative)
+            elif name.strip() == module:
+                return int(cumulative)
+
+    return total
+
+
+def run_benchmark(runs=5):
+    """Returns {scenario: median microseconds} over `runs` fresh interpreters."""
+    with tempfile.TemporaryDirectory(prefix="innerverse_bench_") as workdir:
+        return {
+            name: statistics.median(run_once(code, module, workdir) for _ in range(runs))
+            for name, (code, module) in SCENARIOS.items()
+        }
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(json.dumps({"runs": runs, "import_time_us": run_benchmark(runs)}, indent=2))
@@ -8,34 +8,39 @@ FIXED ISSUES:
 - Added better error handling
 """
 
-from textblob import TextBlob
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
 from security import check_for_crisis
-from assessments import run_gad7, run_phq9
+from lexicon import scan
+from tokenizer import normalize
+from incremental import SegmentScorer
+from logs import get_logger
+from metrics import METRICS
+from rules import RULES
 
-# Only import utils if running as standalone (not when used by Flask)
-try:
-    from utils.interface import slow_print, slow_input, display_report
-    from utils.storage import load_history, save_entry
-    from utils.avatar import get_avatar_response
-    STANDALONE_MODE = True
-except ImportError:
-    STANDALONE_MODE = False
+# TextBlob (and the nltk stack behind it) takes several hundred ms to import,
+# so it is loaded on first use (incremental.py) or by warm_up(). The
+# terminal-only utils and assessments are imported inside the CLI block at
+# the bottom of this file.
 
+LOG = get_logger("engine")
 
-# ============================================================
-# EMOTION LEXICON - Pattern matching for specific intents
-# ============================================================
 
-INTENT_PATTERNS = {
-    "JOY": ["i'm so happy", "feeling great", "love this", "i'm excited", "amazing", "wonderful"],
-    "ANGER": ["i'm frustrated", "i'm pissed", "felt disrespected", "i hate", "upset", "i'm upset", "angry", "furious"],
-    "SADNESS": ["i'm really sad", "i'm hurting", "this is hard for me", "i feel lonely", "depressed", "crying"],
-    "ANXIETY": ["i'm anxious", "i'm really anxious", "i'm worried", "my anxiety", "freaks me out", "nervous", "scared"],
-    "OVERWHELMED": ["i'm totally overwhelmed", "too much on my plate", "can't handle all of this", "can't cope", "drowning"],
-    "CONFUSION": ["i'm confused", "i don't get it", "need some clarity", "don't understand"],
-    "GRATITUDE": ["i really appreciate", "thanks for", "i'm grateful", "thankful", "blessed"],
-    "EXCITEMENT": ["i'm so pumped", "can't wait", "so excited", "hyped"]
-}
+def warm_up():
+    """
+    Pays the one-off startup costs now instead of on the first request:
+    imports TextBlob, loads its sentiment lexicon and runs the pipeline once.
+    
+    A pre-fork server should call this once in the master process (for
+    gunicorn: --preload with INNERVERSE_WARM_UP=1) so every worker inherits
+    a warm engine.
+    """
+    analyze("Warming up the house. It feels really nice today!")
 
 
 def detect_intent(user_text):
@@ -46,10 +51,17 @@ def detect_intent(user_text):
     if not user_text:
         return None
     
-    clean_text = user_text.lower().strip()
+    return _intent_from_scan(scan(normalize(user_text).strip()))
+
+
+def _intent_from_scan(found):
+    """detect_intent() from an existing lexicon scan."""
+    # Negated phrases ("i'm not angry") are already dropped or inverted
+    matched = found.intents()
     
-    for emotion, patterns in INTENT_PATTERNS.items():
-        if any(pattern in clean_text for pattern in patterns):
+    # The lexicon's intent order decides which emotion wins
+    for emotion in found.lexicon.intent_patterns:
+        if emotion in matched:
             return emotion
     
     return None
@@ -63,21 +75,114 @@ def get_intensity_multiplier(user_text):
     if not user_text:
         return 1.0
     
-    text = user_text.lower()
+    return _multiplier_from_scan(scan(normalize(user_text)))
+
+
+def _multiplier_from_scan(found):
+    """get_intensity_multiplier() from an existing lexicon scan."""
+    matched = found.labels("intensity")
+    
+    # High, then Medium, then Low intensity
+    for multiplier, _ in found.lexicon.intensity_modifiers:
+        if multiplier in matched:
+            return multiplier
+    
+    return 1.0
+
+
+# ============================================================
+# SENTIMENT CACHE - Resubmitted entries skip TextBlob
+# ============================================================
+
+class SentimentCache:
+    """
+    Thread-safe LRU cache of sentiment scores (and, in SEGMENT_CACHE, of
+    per-sentence results; see incremental.py).
+    
+    Keys are hashes of the normalized entry text, so the journal text itself
+    is never held in memory longer than the request that sent it.
+    """
     
-    # High Intensity
-    if any(word in text for word in ["extremely", "totally", "pissed off", "can't handle", "unbearable"]):
-        return 2.0
+    def __init__(self, capacity):
+        self.capacity = max(0, capacity)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
     
-    # Medium Intensity
-    if any(word in text for word in ["really", "very", "so", "quite"]):
-        return 1.5
+    def get(self, key):
+        """Returns the cached score, or None on a miss."""
+        with self._lock:
+            score = self._entries.get(key)
+            if score is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return score
     
-    # Low Intensity
-    if any(word in text for word in ["kinda", "sort of", "a little", "somewhat"]):
-        return 0.5
+    def put(self, key, score):
+        """Stores a score, evicting the least recently used one if full."""
+        if self.capacity == 0:
+            return
+        with self._lock:
+            self._entries[key] = score
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
     
-    return 1.0
+    def resize(self, capacity):
+        """Changes the capacity, evicting the oldest entries if it shrank."""
+        with self._lock:
+            self.capacity = max(0, capacity)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """Drops every cached score (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        """Returns size, capacity and hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+# Capacity knob: INNERVERSE_SENTIMENT_CACHE_SIZE (0 turns the cache off)
+SENTIMENT_CACHE = SentimentCache(int(os.environ.get("INNERVERSE_SENTIMENT_CACHE_SIZE", "1024")))
+
+# Per-sentence polarities and lexicon hits, so an edited or growing entry only
+# re-reads the sentences that changed. Knob: INNERVERSE_SEGMENT_CACHE_SIZE
+SEGMENT_CACHE = SentimentCache(int(os.environ.get("INNERVERSE_SEGMENT_CACHE_SIZE", "8192")))
+SEGMENTS = SegmentScorer(SEGMENT_CACHE)
+
+METRICS.track_cache("sentiment", SENTIMENT_CACHE)
+METRICS.track_cache("segment", SEGMENT_CACHE)
+
+
+def invalidate_sentiment_cache():
+    """Clears cached scores. Call this whenever the sentiment lexicon changes."""
+    SENTIMENT_CACHE.clear()
+    SEGMENT_CACHE.clear()
+
+
+def _sentiment_cache_key(user_text):
+    """
+    Hash of the text with whitespace runs collapsed (TextBlob ignores them).
+    Case is kept because the ALL CAPS booster depends on it.
+    """
+    normalized = " ".join(user_text.split())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
 
 
 def check_for_assessment_trigger():
@@ -85,17 +190,18 @@ def check_for_assessment_trigger():
     Checks if the user has had 3 days of 'Heavy' weather in the saved history.
     Only available in standalone mode.
     """
-    if not STANDALONE_MODE:
+    try:
+        from utils.storage import get_recent_entries
+    except ImportError:
         return False
     
     try:
-        history = load_history()
+        # Check the last 3 entries
+        last_three = get_recent_entries(3)
         
-        if not history or len(history) < 3:
+        if len(last_three) < 3:
             return False
         
-        # Check the last 3 entries
-        last_three = history[-3:]
         heavy_weather_count = sum(
             1 for entry in last_three 
             if entry.get("weather") in ["STEADY RAIN", "THUNDERSTORM"]
@@ -106,30 +212,141 @@ def check_for_assessment_trigger():
         return False
 
 
+# ============================================================
+# SENTIMENT ENGINE - TextBlob, or the vectorized lexicon
+# ============================================================
+
+# "textblob" (default) or "vector" (vector_sentiment.py, needs NumPy)
+SENTIMENT_ENGINE = os.environ.get("INNERVERSE_SENTIMENT_ENGINE", "textblob")
+
+# Texts scored together by score_entries() with the vector engine
+SCORE_BATCH_SIZE = 256
+
+_vector_scorer = None
+_vector_lock = threading.Lock()
+
+
+def set_sentiment_engine(name):
+    """
+    Switches the sentiment engine and clears cached scores.
+    
+    Args:
+        name: "textblob" or "vector"
+    
+    Returns:
+        str: The engine now in use ("textblob" if NumPy is missing)
+    """
+    global SENTIMENT_ENGINE, _vector_scorer
+    if name not in ("textblob", "vector"):
+        raise ValueError(f"Unknown sentiment engine: {name}")
+    
+    with _vector_lock:
+        SENTIMENT_ENGINE = name
+        _vector_scorer = None
+    invalidate_sentiment_cache()
+    
+    _get_vector_scorer()
+    return SENTIMENT_ENGINE
+
+
+def _get_vector_scorer():
+    """The VectorSentiment instance, or None when TextBlob is the engine."""
+    global SENTIMENT_ENGINE, _vector_scorer
+    if SENTIMENT_ENGINE != "vector":
+        return None
+    if _vector_scorer is None:
+        with _vector_lock:
+            if _vector_scorer is None:
+                from vector_sentiment import VectorSentiment, available
+                if not available():
+                    LOG.warning("vector_engine_unavailable", reason="numpy not installed", fallback="textblob")
+                    SENTIMENT_ENGINE = "textblob"
+                    return None
+                _vector_scorer = VectorSentiment()
+    return _vector_scorer
+
+
+def _boost(user_text, sentiment):
+    """Applies the intensity boosters and clamps to -1.0..1.0."""
+    # INTENSITY BOOSTERS: Check for ALL CAPS or excessive punctuation
+    if user_text.isupper() or "!!!" in user_text:
+        sentiment = sentiment * 1.5
+    
+    # Clamp to valid range
+    return max(-1.0, min(1.0, sentiment))
+
+
 def analyze_journal_entry(user_text):
     """
     Analyzes the sentiment of the text using TextBlob.
     Returns a polarity score from -1.0 (very negative) to 1.0 (very positive).
+    
+    Scores are cached (see SENTIMENT_CACHE), so resubmitting the same entry
+    doesn't rebuild the TextBlob. A new or edited entry only has its changed
+    sentences re-read (see SEGMENTS); the score is the same as a full run.
+    With INNERVERSE_SENTIMENT_ENGINE=vector the vectorized lexicon
+    (vector_sentiment.py) scores it instead.
     """
     if not user_text or not user_text.strip():
         return 0.0
     
+    cache_key = _sentiment_cache_key(user_text)
+    cached = SENTIMENT_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
-        blob = TextBlob(user_text)
-        sentiment = blob.sentiment.polarity
-        
-        # INTENSITY BOOSTERS: Check for ALL CAPS or excessive punctuation
-        if user_text.isupper() or "!!!" in user_text:
-            sentiment = sentiment * 1.5
-        
-        # Clamp to valid range
-        sentiment = max(-1.0, min(1.0, sentiment))
+        vector = _get_vector_scorer()
+        if vector is not None:
+            sentiment = vector.polarity(user_text)
+        else:
+            sentiment = SEGMENTS.polarity(user_text)
         
+        sentiment = _boost(user_text, sentiment)
+        SENTIMENT_CACHE.put(cache_key, sentiment)
         return sentiment
     except Exception:
         return 0.0
 
 
+def score_entries(texts):
+    """
+    analyze_journal_entry() for many texts at once. The vector engine
+    scores all uncached texts in one vectorized pass; if that pass fails
+    it is logged and the texts are scored one at a time instead.
+    
+    Returns:
+        list: One score per text, in order
+    """
+    vector = _get_vector_scorer()
+    if vector is None:
+        return [analyze_journal_entry(text) for text in texts]
+    
+    scores = [0.0] * len(texts)
+    todo = []
+    for index, text in enumerate(texts):
+        if not text or not text.strip():
+            continue
+        cached = SENTIMENT_CACHE.get(_sentiment_cache_key(text))
+        if cached is not None:
+            scores[index] = cached
+        else:
+            todo.append(index)
+    
+    try:
+        polarities = vector.polarity_batch([texts[index] for index in todo])
+    except Exception as e:
+        LOG.error("vector_batch_failed", error=type(e).__name__, texts=len(todo), exc_info=True)
+        for index in todo:
+            scores[index] = analyze_journal_entry(texts[index])
+        return scores
+    
+    for index, polarity in zip(todo, polarities):
+        scores[index] = _boost(texts[index], float(polarity))
+        SENTIMENT_CACHE.put(_sentiment_cache_key(texts[index]), scores[index])
+    return scores
+
+
 def translate_score_to_weather(sentiment_score, user_text):
     """
     Translates the sentiment score and detected intent into a weather state.
@@ -141,38 +358,59 @@ def translate_score_to_weather(sentiment_score, user_text):
     Returns:
         String representing the weather state
     """
-    intent = detect_intent(user_text)
-    multiplier = get_intensity_multiplier(user_text)
+    found = scan(normalize(user_text or ""))
     
-    # --- PRIORITY 1: Positive Intents ---
-    if intent in ["JOY", "GRATITUDE", "EXCITEMENT"]:
-        return "RADIANT SUN"
-    
-    # --- PRIORITY 2: Specific Negative Intents ---
-    if intent == "ANXIETY":
-        return "FOGGY MIST"
+    return _weather_for(sentiment_score, _intent_from_scan(found), _multiplier_from_scan(found))
+
+
+def _weather_for(sentiment_score, intent, multiplier):
+    """
+    translate_score_to_weather() once intent and multiplier are known.
     
-    # --- PRIORITY 3: Anger or Overwhelmed (High Intensity) ---
-    if intent in ["ANGER", "OVERWHELMED"] and multiplier >= 1.5:
-        return "THUNDERSTORM"
+    The priorities (positive intents, anxiety, intense anger or overwhelm,
+    sadness, then the adjusted score) live in rules.json; see rules.py.
+    """
+    return RULES.current.weather(sentiment_score, intent, multiplier)
+
+
+def apply_thermal_logic(current_heat, intent, score):
+    """
+    Returns the new heat level for a house after an entry with this intent
+    and score. Shared by the Flask (app.py) and ASGI (asgi.py) servers.
     
-    # --- PRIORITY 4: Standard Sadness ---
-    if intent == "SADNESS":
-        return "STEADY RAIN"
+    Heat represents intensity/distress: anger and overwhelm heat the house,
+    positive entries cool it (rules.json, "heat"). Natural cooling happens
+    over time, not per entry (see decayed_heat).
+    """
+    return RULES.current.heat(current_heat, intent, score)
+
+
+# Seconds for the heat to cool to 1/e (~37%) of its value with no new
+# entries. Knob: INNERVERSE_HEAT_TIME_CONSTANT
+HEAT_TIME_CONSTANT = float(os.environ.get("INNERVERSE_HEAT_TIME_CONSTANT", "3600"))
+
+
+def decayed_heat(heat, updated_at, now=None, time_constant=HEAT_TIME_CONSTANT):
+    """
+    The house slowly cools between entries: heat falls off exponentially
+    with the time since it was last set. Computed whenever the heat is
+    read, so nothing has to be written while the house cools.
     
-    # --- FALLBACK: Use sentiment score ---
-    adjusted_score = sentiment_score * multiplier
+    Args:
+        heat: Heat stored at `updated_at`
+        updated_at: Unix time of that update (None = no decay)
+        now: Unix time to compute the heat for (default: now)
+        time_constant: Seconds per factor e of cooling (0 = no decay)
     
-    if adjusted_score > 0.5:
-        return "RADIANT SUN"
-    elif adjusted_score > 0.1:
-        return "CLEAR SKIES"
-    elif adjusted_score > -0.1:
-        return "FOGGY MIST"
-    elif adjusted_score > -0.5:
-        return "STEADY RAIN"
-    else:
-        return "THUNDERSTORM"
+    Returns:
+        float: The heat at `now`
+    """
+    if not heat or updated_at is None or time_constant <= 0:
+        return heat
+    elapsed = (time.time() if now is None else now) - updated_at
+    if elapsed <= 0:
+        return heat
+    return heat * math.exp(-elapsed / time_constant)
 
 
 def update_world_visual(weather, score):
@@ -216,16 +454,158 @@ def analyze_structure(user_text):
     return is_run_on, is_frantic
 
 
+# ============================================================
+# FULL PIPELINE - Every stage computed once per entry
+# ============================================================
+
+class Analysis:
+    """
+    Read-only result of running one entry through the whole engine.
+    
+    Attributes:
+        score: Sentiment polarity from analyze_journal_entry()
+        intent: Emotion name from detect_intent() (or None)
+        multiplier: Intensity from get_intensity_multiplier()
+        weather: Weather state from translate_score_to_weather()
+        is_run_on, is_frantic: Structure flags from analyze_structure()
+        lexicon_version: Version of the lexicon the entry was scanned with
+    """
+    
+    __slots__ = ("score", "intent", "multiplier", "weather", "is_run_on", "is_frantic", "lexicon_version")
+    
+    def __init__(self, score, intent, multiplier, weather, is_run_on, is_frantic, lexicon_version=None):
+        values = (score, intent, multiplier, weather, is_run_on, is_frantic, lexicon_version)
+        for name, value in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("Analysis is read-only")
+    
+    def __delattr__(self, name):
+        raise AttributeError("Analysis is read-only")
+    
+    def __eq__(self, other):
+        if not isinstance(other, Analysis):
+            return NotImplemented
+        return self._values() == other._values()
+    
+    def __hash__(self):
+        return hash(self._values())
+    
+    def __reduce__(self):
+        # Rebuild through __init__ so results can cross process boundaries
+        # (analysis_pool.py); the default pickling would call __setattr__
+        return (Analysis, self._values())
+    
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"Analysis({fields})"
+    
+    def _values(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+    
+    def to_dict(self):
+        """Returns the fields as a plain dict."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def analyze(user_text, found=None, score=None, lexicon=None):
+    """
+    Runs the whole pipeline on one entry.
+    
+    The text is lowercased and scanned against the lexicon once; intent,
+    intensity and weather all read from that same scan.
+    
+    Args:
+        user_text: The journal entry
+        found: Optional lexicon.Scan of normalize(user_text) that is already
+               known (live.py keeps one up to date while the user types)
+        score: Optional analyze_journal_entry() result, if already known
+        lexicon: The lexicon.Lexicon to scan with when `found` isn't given
+                 (default: the one in force). The servers pass the one the
+                 crisis firewall used, so both read the same phrase lists
+    
+    Returns:
+        Analysis: score, intent, multiplier, weather and structure flags
+    """
+    user_text = user_text or ""
+    # Stage timings go to /metrics (see metrics.py). Stages handed in by
+    # the caller (found, score) were timed where they ran.
+    started = time.perf_counter()
+    if found is None:
+        found = SEGMENTS.scan(user_text, lexicon)
+        METRICS.observe("scan", time.perf_counter() - started)
+    
+    if score is None:
+        scoring = time.perf_counter()
+        score = analyze_journal_entry(user_text)
+        METRICS.observe("sentiment", time.perf_counter() - scoring)
+    
+    classifying = time.perf_counter()
+    intent = _intent_from_scan(found)
+    multiplier = _multiplier_from_scan(found)
+    is_run_on, is_frantic = analyze_structure(user_text)
+    mapping = time.perf_counter()
+    weather = _weather_for(score, intent, multiplier)
+    METRICS.observe("intent", mapping - classifying)
+    METRICS.observe("weather", time.perf_counter() - mapping)
+    
+    return Analysis(
+        score=score,
+        intent=intent,
+        multiplier=multiplier,
+        weather=weather,
+        is_run_on=is_run_on,
+        is_frantic=is_frantic,
+        lexicon_version=found.lexicon.version
+    )
+
+
+def analyze_batch(texts, lexicon=None):
+    """
+    Runs analyze() over many entries (backfills, re-scoring history).
+    
+    Args:
+        texts: Iterable of journal entry strings
+        lexicon: The lexicon.Lexicon to scan with (default: the one in force)
+    
+    Yields:
+        Analysis: One result per text, in order
+    """
+    chunk = []
+    for text in texts:
+        chunk.append((text or "").strip())
+        if len(chunk) == SCORE_BATCH_SIZE:
+            yield from _analyze_chunk(chunk, lexicon)
+            chunk = []
+    if chunk:
+        yield from _analyze_chunk(chunk, lexicon)
+
+
+def _analyze_chunk(texts, lexicon=None):
+    with METRICS.time("sentiment" if len(texts) == 1 else "sentiment_batch"):
+        scores = score_entries(texts)
+    for text, score in zip(texts, scores):
+        yield analyze(text, score=score, lexicon=lexicon)
+
+
 # ============================================================
 # STANDALONE MODE - Command Line Interface
 # ============================================================
 
 if __name__ == "__main__":
-    if not STANDALONE_MODE:
+    try:
+        from utils.interface import slow_print, slow_input, display_report
+        from utils.storage import save_entry
+        from utils.avatar import get_avatar_response
+    except ImportError:
         print("ERROR: utils module not found. Cannot run in standalone mode.")
         print("This file is meant to be imported by app.py for web use.")
         exit(1)
     
+    from assessments import run_gad7, run_phq9
+    
+    
     slow_print("=" * 50)
     slow_print("    🏠 WELCOME TO INNERVERSE 🏠")
     slow_print("=" * 50)
@@ -249,15 +629,16 @@ if __name__ == "__main__":
         print("!" * 50)
     else:
         # 3. Proceed to analysis
-        mood_score = analyze_journal_entry(user_input)
-        weather = translate_score_to_weather(mood_score, user_input)
+        analysis = analyze(user_input)
+        mood_score = analysis.score
+        weather = analysis.weather
         
         # 4. Show result
         description = update_world_visual(weather, mood_score)
         display_report(weather, mood_score, description)
         
         # 5. Avatar response
-        current_intent = detect_intent(user_input)
+        current_intent = analysis.intent
         avatar_voice = get_avatar_response(weather, current_intent)
         print(f"\n✨ {avatar_voice}\n")
         
@@ -0,0 +1,364 @@
+"""
+FILE: incremental.py
+PURPOSE: Sentence-by-sentence sentiment and lexicon scanning, so an entry
+         that grows or gets edited only has its changed sentences re-read.
+NOTES:
+- Text is cut into segments at sentence ends; each segment's TextBlob
+  polarities and lexicon hits are cached under a hash of its text
+- The result is always identical to a full TextBlob run over the whole
+  text. TextBlob's assessment pass can carry a negation ("not. Good")
+  or an exclamation boost across a sentence end; segments where that can
+  happen are re-assessed together, as one piece
+- Lexicon hits are cached with the key of the lexicon that found them;
+  after a lexicon reload each segment is rescanned the first time it is
+  seen again (its polarities stay cached)
+- Used by engine.analyze_journal_entry() and engine.analyze()
+"""
+
+import hashlib
+import re
+
+from lexicon import LEXICON, Scan
+from tokenizer import boundary_hits, normalize
+
+
+# Where one segment ends and the next begins: after sentence-ending
+# punctuation (plus closing quotes/brackets) and whitespace, when the next
+# segment starts with a letter or digit
+SENTENCE_END = re.compile(r"[.!?]+[\"')\]’”]*\s+(?=\w)")
+
+# A lexicon phrase containing a sentence end could match across two
+# segments; if one ever does, scan() falls back to scanning the whole text
+_STRADDLE = re.compile(r"[.!?]+[\"')\]’”]*\s")
+
+# TextBlob's sentiment lexicon (textblob.en.sentiment), loaded on first use.
+# This is what TextBlob(text).sentiment runs underneath.
+_pattern = None
+
+
+def _get_pattern():
+    global _pattern
+    if _pattern is None:
+        from textblob.en import sentiment
+        _pattern = sentiment
+    return _pattern
+
+
+def split_segments(text):
+    """
+    Cuts text into sentence segments. Joining them gives back `text`.
+
+    Returns:
+        list: Segment strings (each keeps its trailing whitespace)
+    """
+    segments = []
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        segments.append(text[start:match.end()])
+        start = match.end()
+    if start < len(text):
+        segments.append(text[start:])
+    return segments
+
+
+class _Segment:
+    """Cached results for one segment of text."""
+
+    __slots__ = ("polarities", "has_known", "leading_bang", "clean_end", "hits")
+
+    def __init__(self, polarities, has_known, leading_bang, clean_end, hits):
+        self.polarities = polarities      # tuple of assessment polarities, in order
+        self.has_known = has_known        # contains a word from the sentiment lexicon
+        self.leading_bang = leading_bang  # "!" before its first known word
+        self.clean_end = clean_end        # nothing left pending (given a clean start)
+        self.hits = hits                  # (lexicon key, hits in normalize(segment) or None)
+
+
+class SegmentScorer:
+    """
+    Polarity and lexicon scan of a text, computed per segment and cached.
+
+    Args:
+        cache: An engine.SentimentCache (or anything with get/put/clear)
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self._scan_is_local = {}  # lexicon key -> no phrase spans a sentence end
+
+    def polarity(self, text):
+        """
+        TextBlob polarity of `text`, before any of engine's boosters.
+
+        Returns:
+            float: Exactly TextBlob(text).sentiment.polarity
+        """
+        segments = split_segments(text)
+        infos = [self._segment(segment) for segment in segments]
+        independent = _independent_starts(infos)
+
+        # Group segments into runs that TextBlob would assess independently
+        total, count = 0, 0
+        run_start = 0
+        for index in range(1, len(segments) + 1):
+            if index < len(segments) and not independent[index]:
+                continue
+            if index - run_start == 1:
+                polarities = infos[run_start].polarities
+            else:
+                polarities = self._run_polarities("".join(segments[run_start:index]))
+            # Same order and arithmetic as TextBlob's own average
+            for p in polarities:
+                total += 1 * p
+                count += 1
+            run_start = index
+
+        return total / float(count or 1)
+
+    def scan(self, text, lexicon=None):
+        """
+        Lexicon scan of normalize(text), equal to lexicon.scan(normalize(text)).
+
+        Args:
+            lexicon: The lexicon.Lexicon to use (default: the one in force)
+
+        Returns:
+            lexicon.Scan
+        """
+        lexicon = lexicon or LEXICON.current
+        clean_text = normalize(text)
+        if not self.scan_is_local(lexicon):
+            return lexicon.scan(clean_text)
+
+        hits = []
+        offset = 0
+        for segment in split_segments(text):
+            segment_hits = self._segment_hits(segment, lexicon)
+            if segment_hits is None:
+                # Lowercasing changed the length; positions would drift
+                return lexicon.scan(clean_text)
+            hits.extend(hit._replace(start=hit.start + offset, end=hit.end + offset) for hit in segment_hits)
+            offset += len(segment)
+        return Scan(hits, lexicon, clean_text)
+
+    def scan_is_local(self, lexicon):
+        """True if no phrase of `lexicon` can match across a sentence end."""
+        local = self._scan_is_local.get(lexicon.key)
+        if local is None:
+            local = not any(_STRADDLE.search(phrase) for phrase in lexicon.matcher.phrases())
+            self._scan_is_local[lexicon.key] = local
+        return local
+
+    # --------------------------------------------------------
+    # Internals
+    # --------------------------------------------------------
+
+    def _segment(self, segment):
+        key = _key(b"s", segment)
+        info = self.cache.get(key)
+        if info is None:
+            info = _score_segment(segment)
+            self.cache.put(key, info)
+        return info
+
+    def _segment_hits(self, segment, lexicon):
+        info = self._segment(segment)
+        key, hits = info.hits
+        if key != lexicon.key:
+            # Found by another lexicon version; one assignment, so readers
+            # of the shared cache entry see either the old pair or the new
+            hits = _hits(segment, lexicon)
+            info.hits = (lexicon.key, hits)
+        return hits
+
+    def _run_polarities(self, run_text):
+        key = _key(b"r", run_text)
+        polarities = self.cache.get(key)
+        if polarities is None:
+            polarities = tuple(p for _, p, _, _ in _assess(_words(run_text)))
+            self.cache.put(key, polarities)
+        return polarities
+
+
+def _key(kind, text):
+    return hashlib.blake2b(kind + text.encode("utf-8"), digest_size=16).digest()
+
+
+def _words(text):
+    """The lowercased word stream TextBlob's sentiment assesses."""
+    return [w.lower() for w in " ".join(_get_pattern().tokenizer(text)).split()]
+
+
+def _assess(words):
+    return _get_pattern().assessments((w, None) for w in words)
+
+
+def _score_segment(segment):
+    pattern = _get_pattern()
+    words = _words(segment)
+
+    lexicon = LEXICON.current
+
+    leading_bang = False
+    for word in words:
+        if _is_known(pattern, word):
+            break
+        if word == "!":
+            leading_bang = True
+            break
+
+    return _Segment(
+        polarities=tuple(p for _, p, _, _ in _assess(words)),
+        has_known=any(_is_known(pattern, word) for word in words),
+        leading_bang=leading_bang,
+        clean_end=_clean_end(pattern, words),
+        hits=(lexicon.key, _hits(segment, lexicon))
+    )
+
+
+def _hits(segment, lexicon):
+    # Segments start after whitespace and end with it (or at the end of
+    # the text), so token boundaries are the same as in the whole text
+    clean = normalize(segment)
+    if len(clean) != len(segment):
+        return None
+    return tuple(boundary_hits(lexicon.matcher.scan(clean), clean, lexicon.prefixes))
+
+
+def _independent_starts(infos):
+    """
+    For each segment, whether TextBlob's assessment of the text from that
+    segment on is unaffected by what comes before it, and vice versa:
+    - nothing may be pending when it starts (see _clean_end; segments
+      without known words pass on whatever was pending before them)
+    - no "!" may come before the next known word, since that boosts the
+      last assessment made before the segment
+
+    Returns:
+        list: One bool per segment (the first is always True)
+    """
+    count = len(infos)
+
+    pending_clear = [True] * count  # nothing pending after segment i
+    clear = True
+    for index, info in enumerate(infos):
+        clear = info.clean_end and (info.has_known or clear)
+        pending_clear[index] = clear
+
+    bang_ahead = [False] * (count + 1)  # "!" from segment i on, before a known word
+    for index in range(count - 1, -1, -1):
+        info = infos[index]
+        bang_ahead[index] = info.leading_bang or (not info.has_known and bang_ahead[index + 1])
+
+    return [True] + [pending_clear[index - 1] and not bang_ahead[index] for index in range(1, count)]
+
+
+def _is_known(pattern, word):
+    return word in pattern and None in pattern[word]
+
+
+def _clean_end(pattern, words):
+    """
+    True if no modifier ("really") or negation ("not") is still pending at
+    the end of this segment, when it is assessed from a clean start.
+
+    Follows the bookkeeping in TextBlob's Sentiment.assessments() for the
+    words after the last known one (which are all unknown words).
+    """
+    last_known = None
+    for index in range(len(words) - 1, -1, -1):
+        if _is_known(pattern, words[index]):
+            last_known = index
+            break
+
+    modifier = negation = None
+    trailing = words
+    if last_known is not None:
+        word = words[last_known]
+        if any(map(pattern[word].__contains__, pattern.modifiers)):
+            modifier = word
+        if word in pattern.negations:
+            negation = word
+        trailing = words[last_known + 1:]
+
+    for word in trailing:
+        if word in pattern.negations:
+            negation = word
+        elif negation and len(word.strip("'")) > 1:
+            negation = None
+        if negation is not None and modifier is not None and pattern.modifier(modifier):
+            negation = None
+        elif modifier and len(word) > 2:
+            modifier = None
+
+    return modifier is None and negation is None
+
+
+# ============================================================
+# TESTING INTERFACE
+# ============================================================
+
+if __name__ == "__main__":
+    import random
+    import sys
+    import time
+
+    from engine import SentimentCache
+
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    vocabulary = [
+        "good", "bad", "not", "never", "no", "really", "very", "happy", "sad", "I", "am",
+        "don't", "can't", "it's", "a", "the", "day", "terrible", "great", "so", "awful",
+        "!", "!!!", ".", "?", "...", ":)", ":-(", "(!)", "e.g.", "Dr.", "\"", "'", ")",
+        "\n\n", "GOOD", "Not", "Really", "love", "hate", "nice", "U.S.", "etc.", "İ",
+        "also", "every", "I’m", "self-harm", "hated",
+    ]
+
+    print("=" * 60)
+    print("    INCREMENTAL SENTIMENT - EQUALITY CHECK")
+    print("=" * 60)
+
+    from textblob import TextBlob
+    from lexicon import scan
+
+    rng = random.Random(11)
+    scorer = SegmentScorer(SentimentCache(10000))
+    text = ""
+    for round_number in range(rounds):
+        # Grow or edit the text the way a writer would
+        if text and rng.random() < 0.3:
+            pos = rng.randint(0, len(text))
+            text = text[:pos] + rng.choice(vocabulary) + " " + text[pos + rng.randint(0, 6):]
+        else:
+            text += " ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 12)))
+            text += rng.choice([". ", "! ", "? ", " ", ".\n", "!!! "])
+
+        expected = TextBlob(text).sentiment.polarity
+        actual = scorer.polarity(text)
+        if actual != expected:
+            print(f"✗ FAIL - round {round_number}: {actual!r} != {expected!r}")
+            print(repr(text))
+            sys.exit(1)
+        if set(scorer.scan(text).hits) != set(scan(normalize(text)).hits):
+            print(f"✗ FAIL - round {round_number}: lexicon hits differ")
+            sys.exit(1)
+        if len(text) > 4000:
+            text = ""
+    print(f"✓ PASS - {rounds} edits, polarity and hits identical to a full run")
+
+    # A long entry that keeps growing, one sentence at a time
+    sentence = "Today I felt really good about work but not about home. "
+    entry = "".join(f"{sentence[:-2]} {i}. " for i in range(300))
+    scorer = SegmentScorer(SentimentCache(10000))
+    scorer.polarity(entry)
+
+    start = time.perf_counter()
+    TextBlob(entry + "One more thing went well.").sentiment.polarity
+    full = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scorer.polarity(entry + "One more thing went well.")
+    incremental = time.perf_counter() - start
+
+    print(f"{len(entry.split())}-word entry + 1 sentence: full {full * 1000:.1f} ms, "
+          f"incremental {incremental * 1000:.1f} ms ({full / incremental:.0f}x)")
@@ -0,0 +1,261 @@
+"""
+FILE: lexicon.py
+PURPOSE: Every phrase list the engine and the safety firewall look for, compiled
+         into one matcher so a journal entry only has to be scanned once.
+NOTES:
+- The phrase lists live in lexicon.json (intents, intensity modifiers, red
+  flags, warning phrases) with a version string, so they can be updated
+  without touching code or restarting the server
+- LEXICON.current is the compiled Lexicon in force. A changed file is
+  compiled on a background thread and swapped in whole (see watch.py), so
+  requests that are already running finish with the version they started
+  with and never wait for a reload
+- Every Scan remembers the Lexicon that made it; the engine and firewall
+  read the phrase lists from there, and responses report its version
+- Phrases match on token boundaries only (see tokenizer.py); a trailing
+  * lets a phrase end inside a word ("i hate*" also finds "i hated").
+  Red flags and warning phrases always may: the firewall must still see
+  "suicides", "want to dieeee" and "going to killmyself". "exclusions"
+  are phrases whose hits cancel any hit inside them ("want to diet*")
+  The "contractions" table adds the other spellings of a phrase
+  ("can't cope" -> "cannot cope", "cant cope", ...) to the matcher
+- Negators ("not", "never", "no longer", ...) are matched in the same pass.
+  An intent phrase a few tokens after one is dropped, or replaced by its
+  "invert" entry ("not feeling great" -> SADNESS); see Scan.intents().
+  Red flags and warning phrases are never negated: the firewall would
+  rather over-react to "i don't want to die" than miss it
+- Knob: INNERVERSE_LEXICON_FILE (default: lexicon.json next to this file)
+"""
+
+import hashlib
+import json
+import os
+from bisect import bisect_right
+from pathlib import Path
+
+from matcher import PhraseMatcher
+from tokenizer import boundary_hits, in_negation_scope, normalize, phrase_variants, tokenize
+from watch import WatchedFile
+
+
+LEXICON_FILE = Path(os.environ.get("INNERVERSE_LEXICON_FILE", Path(__file__).with_name("lexicon.json")))
+
+
+# ============================================================
+# COMPILED LEXICON
+# ============================================================
+
+class Lexicon:
+    """
+    One version of the lexicon file, compiled. Never changed after loading.
+
+    Attributes:
+        version: The file's "version" string
+        key: Short digest of the contents (cache keys; same phrases -> same key)
+        intent_patterns: {emotion: [phrases]}; order matters, detect_intent()
+                         returns the first emotion that matches
+        intensity_modifiers: [(multiplier, [words])], checked from top to bottom
+        red_flags: Critical phrases that indicate crisis
+        warning_phrases: Secondary warning phrases (lower severity)
+        negation_window: Most tokens between a negator and the phrase it negates
+        negation_breaks: Words that end a negation's scope ("but", ...)
+        negated_intents: {emotion: emotion} an intent turns into when negated
+                         (emotions not listed are dropped)
+        matcher: PhraseMatcher over all of the above, and their variants
+        prefixes: (phrase, tag) pairs that may end inside a word
+    """
+
+    __slots__ = ("version", "key", "intent_patterns", "intensity_modifiers",
+                 "red_flags", "warning_phrases", "negation_window", "negation_breaks",
+                 "negated_intents", "matcher", "prefixes")
+
+    def scan(self, clean_text):
+        """Scans normalized text; see scan()."""
+        return Scan(boundary_hits(self.matcher.scan(clean_text), clean_text, self.prefixes), self, clean_text)
+
+
+def compile_lexicon(config):
+    """
+    Builds a Lexicon and its matcher from the parsed lexicon.json.
+
+    Tags are (kind, label) pairs:
+        ("intent", "JOY"), ("intensity", 2.0),
+        ("red_flag", "<phrase>"), ("warning", "<phrase>"),
+        ("negation", "<phrase>"), ("exclude", "<phrase>")
+
+    Phrases are stored normalized and without their trailing *; every
+    spelling of a phrase gets the tag of the phrase as written.
+
+    Raises:
+        ValueError: If a section is missing or malformed
+    """
+    try:
+        lexicon = Lexicon()
+        lexicon.version = str(config["version"])
+        contractions = {
+            normalize(str(word)): [normalize(str(variant)) for variant in variants]
+            for word, variants in config.get("contractions", {}).items()
+        }
+        intents = {
+            str(emotion): [str(phrase) for phrase in phrases]
+            for emotion, phrases in config["intents"].items()
+        }
+        intensity = [
+            (float(group["multiplier"]), [str(word) for word in group["words"]])
+            for group in config["intensity"]
+        ]
+        red_flags = config["red_flags"]
+        if isinstance(red_flags, dict):
+            # Grouped by category for the people editing the file
+            red_flags = [phrase for group in red_flags.values() for phrase in group]
+        red_flags = [str(phrase) for phrase in red_flags]
+        warning_phrases = [str(phrase) for phrase in config["warning_phrases"]]
+        exclusions = [str(phrase) for phrase in config.get("exclusions", [])]
+        negation = config.get("negation", {})
+        negators = [str(phrase) for phrase in negation.get("phrases", [])]
+        lexicon.negation_window = int(negation.get("window", 3))
+        lexicon.negation_breaks = frozenset(normalize(str(word)) for word in negation.get("breaks", []))
+        lexicon.negated_intents = {
+            str(emotion): str(inverted) for emotion, inverted in negation.get("invert", {}).items()
+        }
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"Malformed lexicon: {e!r}")
+    for emotion, inverted in lexicon.negated_intents.items():
+        if emotion not in intents or inverted not in intents:
+            raise ValueError(f"Unknown intent in negation inversion: {emotion} -> {inverted}")
+
+    matcher = PhraseMatcher()
+    prefixes = set()
+
+    def add(written, kind, label=None, prefix=False):
+        phrase = normalize(written.strip())
+        is_prefix = prefix or phrase.endswith("*")
+        phrase = phrase.rstrip("*").strip()
+        if not phrase:
+            raise ValueError(f"Empty {kind} phrase in lexicon")
+        tag = (kind, phrase if label is None else label)
+        for variant in phrase_variants(phrase, contractions):
+            matcher.add(variant, tag)
+            if is_prefix:
+                prefixes.add((variant, tag))
+        return phrase
+
+    lexicon.intent_patterns = {
+        emotion: [add(pattern, "intent", emotion) for pattern in patterns]
+        for emotion, patterns in intents.items()
+    }
+    lexicon.intensity_modifiers = [
+        (multiplier, [add(word, "intensity", multiplier) for word in words])
+        for multiplier, words in intensity
+    ]
+    # Safety phrases keep substring recall at the end of a word
+    lexicon.red_flags = [add(flag, "red_flag", prefix=True) for flag in red_flags]
+    lexicon.warning_phrases = [add(phrase, "warning", prefix=True) for phrase in warning_phrases]
+    for phrase in negators:
+        add(phrase, "negation")
+    for phrase in exclusions:
+        add(phrase, "exclude")
+    lexicon.matcher = matcher.build()
+    lexicon.prefixes = frozenset(prefixes)
+
+    # Everything that decides which hits a text gets
+    canonical = json.dumps(
+        [intents, intensity, red_flags, warning_phrases, contractions, negators, exclusions], sort_keys=True
+    )
+    lexicon.key = hashlib.blake2b(canonical.encode("utf-8"), digest_size=8).digest()
+
+    return lexicon
+
+
+def load_lexicon(path=LEXICON_FILE):
+    """
+    Reads and compiles a lexicon file.
+
+    Raises:
+        OSError: If the file can't be read
+        ValueError: If it isn't valid lexicon JSON
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return compile_lexicon(json.load(f))
+
+
+# The lexicon in force (read-copy-update; see watch.py)
+LEXICON = WatchedFile(LEXICON_FILE, load_lexicon, name="lexicon").start()
+
+
+class Scan:
+    """
+    Everything the lexicon found in one piece of text.
+
+    Attributes:
+        hits: List of matcher.Hit with positions in the scanned text
+        lexicon: The Lexicon that produced the hits
+        text: The scanned (normalized) text
+    """
+
+    __slots__ = ("hits", "lexicon", "text", "_labels", "_tokens")
+
+    def __init__(self, hits, lexicon, text):
+        self.hits = hits
+        self.lexicon = lexicon
+        self.text = text
+        self._tokens = None
+        self._labels = {}
+        for hit in hits:
+            kind, label = hit.tag
+            self._labels.setdefault(kind, set()).add(label)
+
+    def labels(self, kind):
+        """Set of labels found for one kind, e.g. labels("intent") -> {"JOY"}."""
+        return self._labels.get(kind, frozenset())
+
+    def intents(self):
+        """
+        Intent labels after negation: an intent phrase inside a negator's
+        scope (tokenizer.in_negation_scope) doesn't count for its emotion,
+        and counts for lexicon.negated_intents[emotion] if there is one.
+
+        Returns:
+            set: Emotion names
+        """
+        matched = self.labels("intent")
+        if not matched or "negation" not in self._labels:
+            return matched
+
+        lexicon = self.lexicon
+        # Hits are ordered by end. Only the last negator before a phrase can
+        # be in scope: the gap from any earlier one contains that one's gap
+        negations = [hit for hit in self.hits if hit.tag[0] == "negation"]
+        negation_ends = [hit.end for hit in negations]
+        intents = set()
+        for hit in self.hits:
+            kind, emotion = hit.tag
+            if kind != "intent":
+                continue
+            nearest = bisect_right(negation_ends, hit.start) - 1
+            if nearest >= 0 and in_negation_scope(self.text, negations[nearest], hit,
+                                                  lexicon.negation_window, lexicon.negation_breaks):
+                emotion = lexicon.negated_intents.get(emotion)
+            if emotion is not None:
+                intents.add(emotion)
+        return intents
+
+    def tokens(self):
+        """Word tokens of the scanned text (tokenizer.tokenize, on first use)."""
+        if self._tokens is None:
+            self._tokens = tokenize(self.text)
+        return self._tokens
+
+
+def scan(clean_text, lexicon=None):
+    """
+    Scans normalized text (tokenizer.normalize) for every lexicon phrase
+    in one pass.
+
+    Args:
+        lexicon: The Lexicon to use (default: the one in force)
+
+    Returns:
+        Scan: The hits, grouped by kind
+    """
+    return (lexicon or LEXICON.current).scan(clean_text)
@@ -0,0 +1,222 @@
+"""
+FILE: live.py
+PURPOSE: Live analysis of an entry while it is still being typed, for the
+         /live WebSocket in asgi.py.
+NOTES:
+- The client sends small edits (deltas), not the whole text every time
+- LiveDraft keeps the lexicon scan up to date per edit: only the edited
+  region is re-scanned, and the scan of the untouched tail is reused as
+  soon as the matcher is back in the state it had there before
+- Raw matcher hits are kept per edit; which of them sit on token
+  boundaries (see tokenizer.py) is decided when the scan is read, since an
+  edit next to a hit can turn "so" into "also"
+- A draft keeps using the lexicon it was scanned with; after a lexicon
+  reload, its next edit rescans the whole draft with the new one
+- Debouncer decides when typing has paused long enough to run the
+  sentiment scoring and push a new weather/heat update
+"""
+
+import os
+import time
+
+from engine import analyze
+from lexicon import LEXICON, Scan
+from tokenizer import boundary_hits, normalize
+
+
+# Quiet time after the last edit before an update is sent (seconds)
+DEBOUNCE = float(os.environ.get("INNERVERSE_LIVE_DEBOUNCE", "0.25"))
+
+# Longest a burst of typing can go without an update (seconds)
+MAX_DELAY = float(os.environ.get("INNERVERSE_LIVE_MAX_DELAY", "1.0"))
+
+# Longest draft accepted (characters)
+MAX_DRAFT = 100_000
+
+# Characters re-scanned at a time while looking for the point where an
+# edit stops affecting the scan
+_RESCAN_STEP = 64
+
+
+class LiveDraft:
+    """
+    An entry being typed, with its lexicon scan kept up to date.
+
+    Deltas (JSON objects from the client):
+        {"pos": 12, "delete": 3, "insert": "abc"}  replace 3 characters at 12
+        {"insert": "abc"}                          append at the end
+        {"text": "..."}                            replace the whole draft
+    """
+
+    def __init__(self, max_length=MAX_DRAFT):
+        self.max_length = max_length
+        self.text = ""
+        self.version = 0       # bumped on every edit
+        self.lexicon = LEXICON.current  # the lexicon.Lexicon _hits were found with
+        self._lower = ""
+        self._states = [0]     # matcher state after each prefix of _lower
+        self._hits = []        # matcher.Hit list, ordered by end
+
+    def apply(self, delta):
+        """
+        Applies one edit.
+
+        Raises:
+            ValueError: If the delta is malformed, out of range or would
+                        make the draft too long
+        """
+        if "text" in delta:
+            pos, delete, insert = 0, len(self.text), delta["text"]
+        else:
+            try:
+                pos = int(delta.get("pos", len(self.text)))
+                delete = int(delta.get("delete", 0))
+            except (TypeError, ValueError):
+                raise ValueError("pos and delete must be integers")
+            insert = delta.get("insert", "")
+
+        if not isinstance(insert, str):
+            raise ValueError("Inserted text must be a string")
+        if not 0 <= pos <= len(self.text) or not 0 <= delete <= len(self.text) - pos:
+            raise ValueError("Edit is outside the draft")
+        if len(self.text) - delete + len(insert) > self.max_length:
+            raise ValueError(f"Draft is longer than {self.max_length} characters")
+
+        self.text = self.text[:pos] + insert + self.text[pos + delete:]
+        self.version += 1
+
+        lowered = normalize(insert)
+        if self.lexicon is not LEXICON.current:
+            self._rescan()
+        elif len(lowered) == len(insert) and len(self._lower) + len(lowered) - delete == len(self.text):
+            self._splice(pos, delete, lowered)
+        else:
+            # A few Unicode characters change length when lowercased, so
+            # positions no longer line up; fall back to a full scan
+            self._rescan()
+
+    def scan(self):
+        """Returns the current lexicon.Scan of the normalized draft."""
+        return Scan(boundary_hits(self._hits, self._lower, self.lexicon.prefixes), self.lexicon, self._lower)
+
+    def analyze(self):
+        """Runs engine.analyze() on the draft, reusing the incremental scan."""
+        return analyze(self.text.strip(), self.scan())
+
+    def _rescan(self):
+        self.lexicon = LEXICON.current
+        self._lower = normalize(self.text)
+        self._states = [0]
+        self._hits, _ = self.lexicon.matcher.feed(self._lower, 0, 0, self._states)
+
+    def _splice(self, pos, delete, insert):
+        old_lower, old_states, old_hits = self._lower, self._states, self._hits
+        shift = len(insert) - delete
+        matcher = self.lexicon.matcher
+
+        lower = old_lower[:pos] + insert + old_lower[pos + delete:]
+        states = old_states[:pos + 1]
+        hits = [hit for hit in old_hits if hit.end <= pos]
+
+        # The inserted text itself
+        position = pos + len(insert)
+        found, state = matcher.feed(lower, pos, states[pos], states, end=position)
+        hits.extend(found)
+
+        # Then the old tail, until the matcher is in the same state it was
+        # in at this point before the edit: from there on, every state and
+        # hit is the old one moved by `shift`
+        while position < len(lower):
+            old_position = position - shift
+            if state == old_states[old_position]:
+                states.extend(old_states[old_position + 1:])
+                hits.extend(
+                    hit._replace(start=hit.start + shift, end=hit.end + shift)
+                    for hit in old_hits if hit.end > old_position
+                )
+                break
+
+            step_end = min(position + _RESCAN_STEP, len(lower))
+            found, state = matcher.feed(lower, position, state, states, end=step_end)
+            hits.extend(found)
+            position = step_end
+
+        self._lower, self._states, self._hits = lower, states, hits
+
+
+class Debouncer:
+    """
+    Tracks a burst of edits: due once the user pauses for `quiet` seconds,
+    or `max_delay` seconds after the first edit, whichever comes first.
+    """
+
+    def __init__(self, quiet=DEBOUNCE, max_delay=MAX_DELAY):
+        self.quiet = quiet
+        self.max_delay = max_delay
+        self._first = None
+        self._last = None
+
+    def touch(self, now=None):
+        """Records an edit."""
+        now = time.monotonic() if now is None else now
+        if self._first is None:
+            self._first = now
+        self._last = now
+
+    def due_in(self, now=None):
+        """
+        Returns:
+            float: Seconds until an update is due (0 = now), or None if
+                   nothing changed since the last reset()
+        """
+        if self._first is None:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, min(self._last + self.quiet, self._first + self.max_delay) - now)
+
+    def reset(self):
+        """Call after sending an update."""
+        self._first = self._last = None
+
+
+# ============================================================
+# TESTING INTERFACE
+# ============================================================
+
+if __name__ == "__main__":
+    import random
+    import sys
+
+    from lexicon import scan
+
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    words = ["i", "hate", "love", "so", "really", "scared", "can't", "breathe", "happy",
+             "overwhelmed", "angry", "today", "and", "the", "kill myself", "SO", "İstanbul",
+             "al", "every", "self-harm", "I’m", "'"]
+
+    print("=" * 60)
+    print("    LIVE DRAFT - INCREMENTAL SCAN CHECK")
+    print("=" * 60)
+
+    # Random edits; after each one the incremental scan must equal a full scan
+    rng = random.Random(7)
+    draft = LiveDraft()
+    for _ in range(rounds):
+        pos = rng.randint(0, len(draft.text))
+        delete = rng.randint(0, min(8, len(draft.text) - pos))
+        insert = " ".join(rng.choice(words) for _ in range(rng.randint(0, 3)))
+        draft.apply({"pos": pos, "delete": delete, "insert": insert})
+        if sorted(draft.scan().hits) != sorted(scan(normalize(draft.text)).hits):
+            print(f"✗ FAIL - scan mismatch after inserting {insert!r} at {pos}")
+            sys.exit(1)
+    print(f"✓ PASS - {rounds} random edits, scan always equal to a full re-scan")
+
+    # Typing speed: appending one character at a time to a long entry
+    draft = LiveDraft()
+    draft.apply({"text": "i feel so overwhelmed today and i can't focus. " * 200})
+    start = time.perf_counter()
+    for char in "and honestly i hate how tired i am":
+        draft.apply({"insert": char})
+    per_key = (time.perf_counter() - start) / 34
+    print(f"Keystroke on a {len(draft.text)}-character draft: {per_key * 1e6:.0f} µs")
+    print(f"Draft analysis: {draft.analyze()}")
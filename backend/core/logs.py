@@ -0,0 +1,276 @@
+"""
+FILE: logs.py
+PURPOSE: Structured, leveled logging that never blocks the request path.
+NOTES:
+- Every record is one JSON line on stderr: time, level, logger, event and
+  any fields passed as keyword arguments
+      LOG = get_logger("security")
+      LOG.warning("crisis_detected", score=7)
+- Records go into a bounded queue and a background thread writes them;
+  when the queue is full new records are dropped (and counted) rather
+  than making the request wait
+- Fields that can hold journal content (phrase, text, ...) are redacted
+  to a short keyed hash: within one server run the same phrase gives the
+  same hash, so records can still be correlated, but nothing the user
+  wrote reaches the log. The key is random per process (forked workers
+  share their parent's), so hashing the lexicon doesn't undo it
+- Debug traces are sampled: debug_sampled() picks a share of calls to
+  trace in full, so debug can stay on under load
+- Settings: INNERVERSE_LOG_LEVEL (default INFO), INNERVERSE_LOG_DEBUG_SAMPLE
+  (share of debug traces kept, default 0.01), INNERVERSE_LOG_REDACT
+  (0 turns redaction off, for local debugging only)
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import traceback
+from logging.handlers import QueueHandler, QueueListener
+
+
+LOG_LEVEL = os.environ.get("INNERVERSE_LOG_LEVEL", "INFO").upper()
+DEBUG_SAMPLE = float(os.environ.get("INNERVERSE_LOG_DEBUG_SAMPLE", "0.01"))
+REDACT = os.environ.get("INNERVERSE_LOG_REDACT", "1") != "0"
+
+# Records waiting for the writer thread before new ones are dropped
+QUEUE_SIZE = 10_000
+
+# Field names whose values may contain journal text
+REDACTED_FIELDS = {"phrase", "flag", "text", "entry", "match"}
+
+ROOT_NAME = "innerverse"
+
+# Key for redact(). Without it the few dozen lexicon phrases could simply
+# be hashed and looked up
+_REDACT_KEY = os.urandom(16)
+
+
+# ============================================================
+# RECORDS
+# ============================================================
+
+def redact(value):
+    """Short keyed hash standing in for a piece of journal text."""
+    digest = hashlib.blake2b(str(value).encode("utf-8"), digest_size=4, key=_REDACT_KEY).hexdigest()
+    return f"<redacted:{digest}>"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record."""
+
+    def format(self, record):
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+                    + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exception"] = _format_exception(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def _format_exception(exc_info):
+    if not REDACT:
+        return logging.Formatter().formatException(exc_info)
+    # Frames and exception type only; the message can quote the input
+    # (KeyError: '<journal text>')
+    kind, _, tb = exc_info
+    return "".join(traceback.format_tb(tb)) + kind.__name__
+
+
+class RedactFilter(logging.Filter):
+    """Replaces journal-derived fields with redact() hashes."""
+
+    def filter(self, record):
+        fields = getattr(record, "fields", None)
+        if REDACT and fields:
+            record.fields = {
+                key: redact(value) if key in REDACTED_FIELDS else value
+                for key, value in fields.items()
+            }
+        return True
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # Formatting happens on the writer thread
+        return record
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """
+    Logger whose keyword arguments become fields of the record.
+
+        LOG.info("entry_saved", weather="STEADY RAIN")
+        LOG.error("process_failed", exc_info=True, error="KeyError")
+    """
+
+    def log(self, level, msg, *args, exc_info=None, **fields):
+        if not self.isEnabledFor(level):
+            return
+        if isinstance(exc_info, BaseException):
+            exc_info = (type(exc_info), exc_info, exc_info.__traceback__)
+        elif exc_info and not isinstance(exc_info, tuple):
+            exc_info = sys.exc_info()
+
+        # Built directly: logging's own path walks the stack to find the
+        # caller's file and line, which costs more than the rest together
+        record = self.logger.makeRecord(self.logger.name, level, "", 0, msg, args, exc_info)
+        record.fields = fields
+        self.logger.handle(record)
+
+    def debug_sampled(self):
+        """
+        True if this call should be traced at debug level. Decide once per
+        operation so a trace is either complete or absent.
+        """
+        return self.isEnabledFor(logging.DEBUG) and random.random() < _settings["sample"]
+
+
+# ============================================================
+# PIPELINE
+# ============================================================
+
+_settings = {"sample": DEBUG_SAMPLE}
+_lock = threading.Lock()
+_handler = None
+_listener = None
+
+
+def get_logger(name):
+    """
+    Returns the structured logger for one part of the app
+    (e.g. "security" -> innerverse.security).
+    """
+    _ensure_started()
+    return StructuredLogger(logging.getLogger(f"{ROOT_NAME}.{name}"), {})
+
+
+def configure(level=None, sample_rate=None):
+    """
+    Changes the level and/or debug sample rate at runtime
+    (the CLIs turn on full debug traces this way).
+    """
+    _ensure_started()
+    if level is not None:
+        logging.getLogger(ROOT_NAME).setLevel(level.upper() if isinstance(level, str) else level)
+    if sample_rate is not None:
+        _settings["sample"] = sample_rate
+
+
+def dropped_records():
+    """Records dropped so far because the queue was full."""
+    return _handler.dropped if _handler is not None else 0
+
+
+def flush():
+    """Waits until every queued record has been written."""
+    if _listener is not None:
+        _listener.stop()
+        _listener.start()
+
+
+def _ensure_started():
+    global _handler, _listener
+    if _handler is not None:
+        return
+    with _lock:
+        if _handler is not None:
+            return
+
+        output = logging.StreamHandler(sys.stderr)
+        output.setFormatter(JsonFormatter())
+
+        handler = _DroppingQueueHandler(queue.Queue(QUEUE_SIZE))
+        handler.addFilter(RedactFilter())
+
+        root = logging.getLogger(ROOT_NAME)
+        root.setLevel(LOG_LEVEL)
+        root.addHandler(handler)
+        root.propagate = False
+
+        _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+        _listener.start()
+        _handler = handler
+        atexit.register(_stop)
+
+
+def _restart_in_child():
+    # The writer thread does not survive a fork (analysis pool workers), and
+    # the queue may have been mid-operation; give the child fresh ones
+    global _listener
+    if _handler is None:
+        return
+    _handler.queue = queue.Queue(QUEUE_SIZE)
+    _listener = QueueListener(_handler.queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop():
+    # Writes out whatever is still queued (at exit)
+    if _listener is not None and getattr(_listener, "_thread", None) is not None:
+        _listener.stop()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_in_child)
+
+
+# ============================================================
+# TESTING INTERFACE
+# ============================================================
+
+if __name__ == "__main__":
+    LOG = get_logger("demo")
+    configure(level="DEBUG", sample_rate=1.0)
+
+    LOG.info("started", workers=4)
+    LOG.debug("red_flag", phrase="kill myself", points=5)
+    try:
+        {}["missing"]
+    except KeyError as e:
+        LOG.error("process_failed", exc_info=True, error=type(e).__name__)
+    flush()
+
+    # Cost on the request path with debug off (the production default)
+    configure(level="INFO", sample_rate=0.01)
+    count = 100_000
+    start = time.perf_counter()
+    for _ in range(count):
+        if LOG.debug_sampled():
+            LOG.debug("red_flag", phrase="x", points=5)
+    skipped = (time.perf_counter() - start) / count
+
+    # An enabled record, queued for the writer thread (which discards it here)
+    flush()
+    _listener.handlers = (logging.NullHandler(),)
+    start = time.perf_counter()
+    for index in range(1000):
+        LOG.info("tick", index=index)
+    queued = (time.perf_counter() - start) / 1000
+    flush()
+
+    print(f"Disabled debug trace: {skipped * 1e9:.0f} ns    Queued info record: {queued * 1e6:.1f} µs",
+          file=sys.stderr)
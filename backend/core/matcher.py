@@ -0,0 +1,149 @@
+"""
+FILE: matcher.py
+PURPOSE: Aho-Corasick phrase matcher. Finds every occurrence of every phrase
+         in a single left-to-right pass over the text.
+NOTES:
+- Gives the same answer as checking `phrase in text` for each phrase,
+  including overlapping matches and phrases that contain each other
+- Works on any sequence, not just strings (e.g. a list of words)
+- feed() resumes a scan part-way through, for text that is edited while
+  it is being typed (see live.py)
+"""
+
+from collections import deque, namedtuple
+
+
+# One match: `tag` is whatever was passed to add(), [start, end) is the slice
+Hit = namedtuple("Hit", ["tag", "phrase", "start", "end"])
+
+
+class PhraseMatcher:
+    """
+    Usage:
+        matcher = PhraseMatcher()
+        matcher.add("i hate", "ANGER")
+        matcher.build()
+        matcher.scan("honestly i hate mondays")
+    """
+
+    def __init__(self):
+        self._goto = [{}]     # state -> {symbol: next state}
+        self._fail = [0]      # state -> longest proper suffix state
+        self._output = [[]]   # state -> [(phrase, tag), ...] ending here
+        self._delta = None    # state -> {symbol: next state}, failures folded in
+        self._phrases = []
+        self._built = False
+
+    def add(self, phrase, tag):
+        """Adds a phrase. The same phrase may be added with several tags."""
+        if self._built:
+            raise RuntimeError("Cannot add phrases after build()")
+        if not phrase:
+            return
+
+        state = 0
+        for symbol in phrase:
+            next_state = self._goto[state].get(symbol)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][symbol] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+
+        self._output[state].append((phrase, tag))
+        self._phrases.append(phrase)
+
+    def phrases(self):
+        """Every phrase added so far."""
+        return list(self._phrases)
+
+    def build(self):
+        """Compiles the phrases into a state machine. Call once after add()."""
+        queue = deque(self._goto[0].values())
+        order = [0]
+
+        while queue:
+            state = queue.popleft()
+            order.append(state)
+            for symbol, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fallback = self._fail[state]
+                while fallback and symbol not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(symbol, 0)
+
+                # Inherit matches that end at the suffix state, so a scan
+                # never has to walk the failure chain to report them
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+        # Fold the failure links into a full transition table (breadth-first,
+        # so a state's failure target is always finished before the state).
+        # scan() then does exactly one dict lookup per symbol.
+        self._delta = [None] * len(self._goto)
+        for state in order:
+            transitions = dict(self._delta[self._fail[state]]) if state else {}
+            transitions.update(self._goto[state])
+            self._delta[state] = transitions
+
+        self._built = True
+        return self
+
+    def scan(self, text):
+        """
+        Returns every Hit in `text`, ordered by where the match ends.
+        """
+        if not self._built:
+            raise RuntimeError("Call build() before scan()")
+
+        delta = self._delta
+        output = self._output
+
+        hits = []
+        state = 0
+
+        for position, symbol in enumerate(text):
+            state = delta[state].get(symbol, 0)
+
+            if output[state]:
+                end = position + 1
+                for phrase, tag in output[state]:
+                    hits.append(Hit(tag, phrase, end - len(phrase), end))
+
+        return hits
+
+    def feed(self, text, start=0, state=0, states=None, end=None):
+        """
+        Scans text[start:end] as if text[:start] had already been scanned and
+        left the machine in `state`.
+
+        Args:
+            states: Optional list; the state after each symbol is appended
+                    to it, so a later edit can resume from any position
+
+        Returns:
+            tuple: (hits, state) - hits in text[start:end] with positions in
+                   `text`, and the state after the last symbol
+        """
+        if not self._built:
+            raise RuntimeError("Call build() before feed()")
+
+        delta = self._delta
+        output = self._output
+
+        hits = []
+        record = states.append if states is not None else None
+
+        for position in range(start, len(text) if end is None else end):
+            state = delta[state].get(text[position], 0)
+            if record is not None:
+                record(state)
+
+            if output[state]:
+                end = position + 1
+                for phrase, tag in output[state]:
+                    hits.append(Hit(tag, phrase, end - len(phrase), end))
+
+        return hits, state
@@ -0,0 +1,354 @@
+"""
+FILE: metrics.py
+PURPOSE: Lightweight timers and counters for the request path, exposed at
+         /metrics in the Prometheus text format.
+NOTES:
+- Stage latencies go into fixed histograms (powers of two from 10 µs to
+  ~10 s); p50/p95/p99 are estimated from the buckets, so recording is one
+  bisect and two additions, cheap enough to leave on in production
+- Counters hold distributions (intent, weather, response status)
+- Sentiment/segment cache hit rates are read from the caches when the
+  metrics are rendered
+- Pool workers keep their own METRICS; analysis_pool.py drains it after
+  every chunk and merges it into the server process, so /metrics shows
+  the stages that ran in the workers too
+"""
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+
+
+# Upper bounds of the latency buckets, in seconds (10 µs, 20 µs, ... ~10.5 s)
+LATENCY_BUCKETS = tuple(0.00001 * 2 ** power for power in range(21))
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+PREFIX = "innerverse"
+
+
+class Histogram:
+    """Bucketed latencies for one stage. Not locked; Metrics holds the lock."""
+
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last bucket is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """
+        Estimated q-quantile (0..1), interpolating inside the bucket it
+        falls in.
+
+        Returns:
+            float: Seconds, or None if nothing was observed
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            if bucket and seen + bucket >= rank:
+                if index == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index]
+                return lower + (upper - lower) * (rank - seen) / bucket
+            seen += bucket
+        return self.bounds[-1]
+
+    def snapshot(self):
+        return [list(self.counts), self.total, self.count]
+
+    def merge(self, snapshot):
+        counts, total, count = snapshot
+        for index, bucket in enumerate(counts):
+            self.counts[index] += bucket
+        self.total += total
+        self.count += count
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    Process-wide registry of stage latencies and labelled counters.
+
+    Usage:
+        with METRICS.time("sentiment"):
+            ...
+        @METRICS.timed("crisis_check")
+        def check_for_crisis(...): ...
+        METRICS.observe("intent", seconds)
+        METRICS.count("weather", "STEADY RAIN")
+        METRICS.render()  -> Prometheus text
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}   # stage -> Histogram
+        self._counters = {}     # (name, label) -> count
+        self._caches = {}       # name -> object with stats() (see engine.SentimentCache)
+        self._reported = {}     # name -> (hits, misses) already drained
+        self._gauges = {}       # name -> (help, fn returning a number)
+
+    # --------------------------------------------------------
+    # Recording
+    # --------------------------------------------------------
+
+    def observe(self, stage, seconds):
+        """Records one duration (seconds) for a stage."""
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def time(self, stage):
+        """Context manager that observe()s the time spent inside it."""
+        return _Timer(self, stage)
+
+    def timed(self, stage):
+        """Decorator: every call of the function is observe()d as `stage`."""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(stage, time.perf_counter() - started)
+            return wrapper
+        return decorate
+
+    def count(self, name, label, amount=1):
+        """Adds to the counter `name` for one label value (e.g. an intent)."""
+        key = (name, label)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def track_cache(self, name, cache):
+        """Reports cache.stats() hits and misses under `name`."""
+        self._caches[name] = cache
+
+    def gauge(self, name, help_text, fn):
+        """Registers a value read by fn() each time the metrics are rendered."""
+        self._gauges[name] = (help_text, fn)
+
+    # --------------------------------------------------------
+    # Worker processes
+    # --------------------------------------------------------
+
+    def drain(self):
+        """
+        Takes everything recorded since the last drain (cache hits as the
+        change since then) and resets it. Pool workers call this and send
+        the result to the server process, which merge()s it.
+
+        Returns:
+            dict: Plain data that pickles cheaply
+        """
+        with self._lock:
+            histograms, self._histograms = self._histograms, {}
+            counters, self._counters = self._counters, {}
+
+        for name, cache in self._caches.items():
+            stats = cache.stats()
+            hits, misses = self._reported.get(name, (0, 0))
+            counters[("cache_hits", name)] = stats["hits"] - hits
+            counters[("cache_misses", name)] = stats["misses"] - misses
+            self._reported[name] = (stats["hits"], stats["misses"])
+
+        return {
+            "histograms": {stage: histogram.snapshot() for stage, histogram in histograms.items()},
+            "counters": counters
+        }
+
+    def merge(self, drained):
+        """Adds a drain() result from another process."""
+        with self._lock:
+            for stage, snapshot in drained["histograms"].items():
+                histogram = self._histograms.get(stage)
+                if histogram is None:
+                    histogram = self._histograms[stage] = Histogram()
+                histogram.merge(snapshot)
+            for key, amount in drained["counters"].items():
+                self._counters[key] = self._counters.get(key, 0) + amount
+
+    # --------------------------------------------------------
+    # Exposition
+    # --------------------------------------------------------
+
+    def render(self):
+        """
+        Returns:
+            str: Every metric in the Prometheus text exposition format
+        """
+        with self._lock:
+            histograms = {stage: histogram.snapshot() for stage, histogram in self._histograms.items()}
+            counters = dict(self._counters)
+
+        # Hits and misses in this process (merged worker counts are already in `counters`)
+        for name, cache in self._caches.items():
+            stats = cache.stats()
+            hits, misses = self._reported.get(name, (0, 0))
+            counters[("cache_hits", name)] = counters.get(("cache_hits", name), 0) + stats["hits"] - hits
+            counters[("cache_misses", name)] = counters.get(("cache_misses", name), 0) + stats["misses"] - misses
+
+        lines = []
+        _render_histograms(lines, histograms)
+
+        names = sorted(set(name for name, _ in counters))
+        for name in names:
+            metric = f"{PREFIX}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (counter, label), value in sorted(counters.items(), key=lambda item: str(item[0][1])):
+                if counter == name:
+                    lines.append(f'{metric}{{{_label_name(name)}="{_escape(label)}"}} {value}')
+
+        cache_names = sorted(set(label for name, label in counters if name == "cache_hits"))
+        if cache_names:
+            metric = f"{PREFIX}_cache_hit_ratio"
+            lines.append(f"# HELP {metric} Share of cache lookups that were hits")
+            lines.append(f"# TYPE {metric} gauge")
+            for name in cache_names:
+                hits = counters.get(("cache_hits", name), 0)
+                lookups = hits + counters.get(("cache_misses", name), 0)
+                lines.append(f'{metric}{{cache="{_escape(name)}"}} {hits / lookups if lookups else 0.0:.4f}')
+
+        for name, (help_text, fn) in sorted(self._gauges.items()):
+            metric = f"{PREFIX}_{name}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {fn()}")
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Forgets every recorded value (registered caches and gauges stay)."""
+        with self._lock:
+            self._histograms = {}
+            self._counters = {}
+        self._reported = {name: _hits_and_misses(cache) for name, cache in self._caches.items()}
+
+
+def _render_histograms(lines, histograms):
+    if not histograms:
+        return
+
+    metric = f"{PREFIX}_stage_duration_seconds"
+    lines.append(f"# HELP {metric} Time spent in each stage of the request path")
+    lines.append(f"# TYPE {metric} histogram")
+    for stage in sorted(histograms):
+        counts, total, count = histograms[stage]
+        cumulative = 0
+        for bound, bucket in zip(LATENCY_BUCKETS, counts):
+            cumulative += bucket
+            lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+        lines.append(f'{metric}_sum{{stage="{stage}"}} {total:.6f}')
+        lines.append(f'{metric}_count{{stage="{stage}"}} {count}')
+
+    metric = f"{PREFIX}_stage_duration_quantile_seconds"
+    lines.append(f"# HELP {metric} p50/p95/p99 per stage, estimated from the histogram buckets")
+    lines.append(f"# TYPE {metric} gauge")
+    for stage in sorted(histograms):
+        histogram = Histogram()
+        histogram.merge(histograms[stage])
+        for q in QUANTILES:
+            value = histogram.quantile(q)
+            if value is not None:
+                lines.append(f'{metric}{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+
+
+# Label each counter is broken down by, e.g. innerverse_responses_total{status="200"}
+LABEL_NAMES = {
+    "intent": "intent",
+    "weather": "weather",
+    "responses": "status",
+    "firewall": "verdict",
+    "cache_hits": "cache",
+    "cache_misses": "cache",
+}
+
+
+def _label_name(counter):
+    return LABEL_NAMES.get(counter, "label")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _hits_and_misses(cache):
+    stats = cache.stats()
+    return stats["hits"], stats["misses"]
+
+
+# The registry every module records into
+METRICS = Metrics()
+
+
+# ============================================================
+# TESTING INTERFACE
+# ============================================================
+
+if __name__ == "__main__":
+    import random
+
+    count = 200_000
+    rng = random.Random(5)
+    samples = [rng.lognormvariate(-7, 1) for _ in range(count)]
+
+    registry = Metrics()
+    start = time.perf_counter()
+    for seconds in samples:
+        registry.observe("sentiment", seconds)
+    per_call = (time.perf_counter() - start) / count
+
+    start = time.perf_counter()
+    for _ in range(count // 4):
+        with registry.time("intent"):
+            pass
+    per_timer = (time.perf_counter() - start) / (count // 4)
+
+    ordered = sorted(samples)
+    histogram = Histogram()
+    for seconds in samples:
+        histogram.observe(seconds)
+
+    print("=" * 60)
+    print("    METRICS - OVERHEAD AND QUANTILE ACCURACY")
+    print("=" * 60)
+    print(f"observe(): {per_call * 1e9:.0f} ns    with time(): {per_timer * 1e9:.0f} ns")
+    for q in QUANTILES:
+        exact = ordered[int(q * (count - 1))]
+        print(f"p{q * 100:g}: exact {exact * 1e6:8.1f} µs, estimated {histogram.quantile(q) * 1e6:8.1f} µs")
+
+    registry.count("intent", "JOY")
+    registry.count("weather", "RADIANT SUN")
+    print()
+    print("\n".join(line for line in registry.render().splitlines() if "_bucket" not in line))
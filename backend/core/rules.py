@@ -0,0 +1,211 @@
+"""
+FILE: rules.py
+PURPOSE: The weather and heat rules, loaded from rules.json and compiled
+         into lookup tables, so tuning them needs no code change.
+NOTES:
+- weather: an intent rule (optionally only from some intensity multiplier
+  up) wins; otherwise the adjusted score (score x multiplier) picks a band
+- heat: an intent rule sets or shifts the heat; otherwise the score picks
+  a band. Heat always stays within 0.0-1.0
+- Bands are listed from low to high scores. "up_to": x includes x,
+  "below": x excludes it, and the last band has no bound
+- Compiled form: one dict lookup per intent, one bisect over the band
+  bounds for scores
+- Hot reload: RULES is a watch.WatchedFile, so the file is checked every
+  couple of seconds and the newly compiled rules replace RULES.current.
+  A broken edit is logged and the previous rules stay in force
+- Knob: INNERVERSE_RULES_FILE (default: rules.json next to this file)
+"""
+
+import json
+import math
+import os
+from bisect import bisect_left
+from pathlib import Path
+
+from watch import WatchedFile
+
+RULES_FILE = Path(os.environ.get("INNERVERSE_RULES_FILE", Path(__file__).with_name("rules.json")))
+
+
+class CompiledRules:
+    """One rules.json, ready to evaluate."""
+
+    __slots__ = ("version", "intent_weather", "weather_bounds", "weather_bands",
+                 "intent_heat", "heat_bounds", "heat_bands")
+
+    def weather(self, score, intent, multiplier):
+        """Weather for an entry (see engine.translate_score_to_weather)."""
+        rule = self.intent_weather.get(intent)
+        if rule is not None and multiplier >= rule[1]:
+            return rule[0]
+        return self.weather_bands[bisect_left(self.weather_bounds, score * multiplier)]
+
+    def heat(self, current_heat, intent, score):
+        """New heat after an entry (see engine.apply_thermal_logic)."""
+        action = self.intent_heat.get(intent)
+        if action is None:
+            action = self.heat_bands[bisect_left(self.heat_bounds, score)]
+        heat = current_heat * action[0] + action[1]
+        return 1.0 if heat > 1.0 else (0.0 if heat < 0.0 else heat)
+
+
+def compile_rules(config):
+    """
+    Turns the parsed rules.json into a CompiledRules.
+
+    Raises:
+        ValueError: If a section is missing or malformed
+    """
+    try:
+        weather, heat = config["weather"], config["heat"]
+        rules = CompiledRules()
+        rules.version = config.get("version")
+
+        rules.intent_weather = {
+            intent: (str(rule["weather"]), float(rule.get("min_multiplier", -math.inf)))
+            for intent, rule in weather.get("intents", {}).items()
+        }
+        rules.weather_bounds, rules.weather_bands = _compile_bands(
+            weather["score_bands"], lambda band: str(band["weather"])
+        )
+
+        # Heat actions as (keep, add): new heat = heat * keep + add
+        rules.intent_heat = {
+            intent: _heat_action(rule) for intent, rule in heat.get("intents", {}).items()
+        }
+        rules.heat_bounds, rules.heat_bands = _compile_bands(heat["score_bands"], _heat_action)
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"Malformed rules: {e!r}")
+    return rules
+
+
+def _heat_action(rule):
+    if "set" in rule:
+        return (0.0, float(rule["set"]))
+    return (1.0, float(rule.get("add", 0.0)))
+
+
+def _compile_bands(bands, value):
+    """
+    Band list -> (bounds, values) for bisect_left: a score belongs to
+    values[bisect_left(bounds, score)].
+    """
+    if not bands or any(key in bands[-1] for key in ("up_to", "below")):
+        raise ValueError("The last score band must have no bound")
+
+    bounds, values = [], []
+    for band in bands[:-1]:
+        if "up_to" in band:
+            bound = float(band["up_to"])
+        elif "below" in band:
+            # x < b is x <= the float just under b
+            bound = math.nextafter(float(band["below"]), -math.inf)
+        else:
+            raise ValueError("Only the last score band may have no bound")
+        if bounds and bound <= bounds[-1]:
+            raise ValueError("Score bands must go from low to high")
+        bounds.append(bound)
+        values.append(value(band))
+    values.append(value(bands[-1]))
+    return tuple(bounds), tuple(values)
+
+
+def load_rules(path=RULES_FILE):
+    """
+    Reads and compiles a rules file.
+
+    Raises:
+        OSError: If the file can't be read
+        ValueError: If it isn't valid rules JSON
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return compile_rules(json.load(f))
+
+
+# The rules in force: RULES.current.weather(score, intent, multiplier)
+RULES = WatchedFile(RULES_FILE, load_rules, name="rules").start()
+
+
+# ============================================================
+# TESTING INTERFACE - Equality with the old chains and benchmark
+# ============================================================
+
+def _chain_weather(sentiment_score, intent, multiplier):
+    # The if/elif chain engine._weather_for() used before rules.json
+    if intent in ["JOY", "GRATITUDE", "EXCITEMENT"]:
+        return "RADIANT SUN"
+    if intent == "ANXIETY":
+        return "FOGGY MIST"
+    if intent in ["ANGER", "OVERWHELMED"] and multiplier >= 1.5:
+        return "THUNDERSTORM"
+    if intent == "SADNESS":
+        return "STEADY RAIN"
+    adjusted_score = sentiment_score * multiplier
+    if adjusted_score > 0.5:
+        return "RADIANT SUN"
+    elif adjusted_score > 0.1:
+        return "CLEAR SKIES"
+    elif adjusted_score > -0.1:
+        return "FOGGY MIST"
+    elif adjusted_score > -0.5:
+        return "STEADY RAIN"
+    else:
+        return "THUNDERSTORM"
+
+
+def _chain_heat(current_heat, intent, score):
+    # engine.apply_thermal_logic() before rules.json (time decay since user-021)
+    if intent == "ANGER":
+        current_heat = 1.0
+    elif intent == "OVERWHELMED":
+        current_heat = min(1.0, current_heat + 0.5)
+    elif intent in ["JOY", "GRATITUDE", "EXCITEMENT"]:
+        current_heat = max(0.0, current_heat - 0.4)
+    elif score > 0.3:
+        current_heat = max(0.0, current_heat - 0.3)
+    elif score > -0.2:
+        current_heat = max(0.0, current_heat - 0.1)
+    elif score < -0.5:
+        current_heat = min(1.0, current_heat + 0.3)
+    return max(0.0, current_heat)
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    rules = RULES.current
+    intents = [None, "JOY", "GRATITUDE", "EXCITEMENT", "ANXIETY", "ANGER", "OVERWHELMED",
+               "SADNESS", "CONFUSION"]
+    rng = random.Random(2)
+    # Random inputs plus every threshold exactly
+    scores = [rng.uniform(-1, 1) for _ in range(20000)] + [-0.5, -0.2, -0.1, 0.1, 0.3, 0.5, 0.0]
+    cases = [(score, intent, multiplier, heat)
+             for score in scores
+             for intent in (rng.choice(intents),)
+             for multiplier in (rng.choice([0.5, 1.0, 1.5, 2.0]),)
+             for heat in (rng.choice([0.0, 0.05, 0.3, 0.95, 1.0]),)]
+    cases += [(s, i, m, h) for s in scores[-7:] for i in intents for m in (0.5, 1.0, 1.5, 2.0) for h in (0.0, 0.5, 1.0)]
+
+    print("=" * 60)
+    print("    RULE TABLE - EQUALITY AND BENCHMARK")
+    print("=" * 60)
+
+    mismatches = 0
+    for score, intent, multiplier, heat in cases:
+        if rules.weather(score, intent, multiplier) != _chain_weather(score, intent, multiplier):
+            mismatches += 1
+        if abs(rules.heat(heat, intent, score) - _chain_heat(heat, intent, score)) > 1e-12:
+            mismatches += 1
+    print(f"{'✓ PASS' if mismatches == 0 else '✗ FAIL'} - {len(cases)} cases, {mismatches} mismatches")
+
+    def bench(fn):
+        start = time.perf_counter()
+        for score, intent, multiplier, heat in cases:
+            fn(score, intent, multiplier, heat)
+        return (time.perf_counter() - start) / len(cases) * 1e9
+
+    chain = bench(lambda s, i, m, h: (_chain_weather(s, i, m), _chain_heat(h, i, s)))
+    table = bench(lambda s, i, m, h: (RULES.current.weather(s, i, m), RULES.current.heat(h, i, s)))
+    print(f"if/elif chains: {chain:6.0f} ns    rule table: {table:6.0f} ns  ({chain / table:.2f}x)")
@@ -6,57 +6,31 @@ FIXED ISSUES:
 - Improved scoring system
 - Better documentation
 - Fixed emoji encoding
+- Findings go to the structured log (logs.py) instead of stdout; matched
+  phrases are redacted and per-call traces are sampled debug records
 """
 
+import json
 
-# ============================================================
-# RED FLAGS - Critical keywords that indicate crisis
-# ============================================================
+# The red flags and warning phrases live in lexicon.json with the other
+# phrase lists, so one compiled matcher can find all of them in a single pass.
+from lexicon import scan
+from tokenizer import normalize
+from logs import configure, get_logger
+from metrics import METRICS
+
+LOG = get_logger("security")
 
-RED_FLAGS = [
-    # Suicidal ideation
-    "kill myself",
-    "end my life",
-    "want to die",
-    "suicide",
-    "suicidal",
-    "end it all",
-    "better off dead",
-    "no reason to live",
-    "wish i was dead",
-    
-    # Self-harm
-    "hurt myself",
-    "self harm",
-    "cut myself",
-    "harm myself",
-    
-    # Plans/intent
-    "have a plan",
-    "going to kill",
-    "tonight is the night",
-    
-    # Desperation indicators
-    "can't go on",
-    "no way out",
-    "give up on life"
-]
-
-# Secondary warning phrases (lower severity but concerning)
-WARNING_PHRASES = [
-    "no point",
-    "what's the point",
-    "tired of living",
-    "can't take it anymore",
-    "want it to end",
-    "everyone better without me"
-]
-
-
-def check_for_crisis(user_text):
+
+@METRICS.timed("crisis_check")
+def check_for_crisis(user_text, lexicon=None):
     """
     Advanced crisis detection that analyzes keywords AND writing structure.
     
+    Args:
+        user_text: The journal entry
+        lexicon: The lexicon.Lexicon to use (default: the one in force)
+    
     Returns:
         bool: True if crisis indicators detected, False otherwise
     
@@ -71,26 +45,36 @@ def check_for_crisis(user_text):
     if not user_text or not user_text.strip():
         return False
     
+    # Full traces for a sampled share of calls (INNERVERSE_LOG_DEBUG_SAMPLE)
+    trace = LOG.debug_sampled()
+    
     score = 0
-    clean_text = user_text.strip().lower()
-    words = clean_text.split()
-    word_count = len(words)
+    clean_text = normalize(user_text.strip())
     
     # ============================================================
     # PART A: KEYWORD ANALYSIS (The "What")
     # ============================================================
     
+    # Phrases only count as whole words ("end it all", not "weekend it all")
+    found = scan(clean_text, lexicon)
+    words = found.tokens()
+    word_count = len(words)
+    red_flags = found.labels("red_flag")
+    warnings = found.labels("warning")
+    
     # Critical red flags - immediate concern
-    for flag in RED_FLAGS:
-        if flag in clean_text:
+    for flag in found.lexicon.red_flags:
+        if flag in red_flags:
             score += 5
-            print(f"[Security] Red flag detected: '{flag}' (+5)")
+            if trace:
+                LOG.debug("red_flag", phrase=flag, points=5)
     
     # Warning phrases - concerning but less severe
-    for phrase in WARNING_PHRASES:
-        if phrase in clean_text:
+    for phrase in found.lexicon.warning_phrases:
+        if phrase in warnings:
             score += 2
-            print(f"[Security] Warning phrase detected: '{phrase}' (+2)")
+            if trace:
+                LOG.debug("warning_phrase", phrase=phrase, points=2)
     
     # ============================================================
     # PART B: STRUCTURAL ANALYSIS (The "How")
@@ -100,34 +84,79 @@ def check_for_crisis(user_text):
     # Long text without punctuation suggests racing thoughts
     if word_count > 40 and "." not in clean_text and "," not in clean_text:
         score += 3
-        print("[Security] Run-on sentence detected (+3)")
+        if trace:
+            LOG.debug("run_on_sentence", points=3)
     
     # 2. Frantic punctuation (high emotional intensity)
     # Multiple exclamation/question marks suggest distress
     if "!!!" in user_text or "???" in user_text:
         score += 2
-        print("[Security] Frantic punctuation detected (+2)")
+        if trace:
+            LOG.debug("frantic_punctuation", points=2)
     
     # 3. Heavy fragments (despair pattern)
-    # Very short, heavy statements like "no more" or "done"
+    # Very short, heavy statements like "no more" or "done" (whole tokens,
+    # so "Done." counts too)
     despair_words = ["no", "never", "done", "stop", "end", "nothing", "nowhere"]
     if word_count < 5 and any(word in words for word in despair_words):
         score += 3
-        print("[Security] Heavy fragment detected (+3)")
+        if trace:
+            LOG.debug("heavy_fragment", points=3)
     
     # ============================================================
     # PART C: FINAL VERDICT
     # ============================================================
     
-    print(f"[Security] Total crisis score: {score}")
+    if trace:
+        LOG.debug("crisis_score", score=score)
     
     # Threshold: 5 or more points triggers safety alert
     if score >= 5:
+        LOG.warning("crisis_detected", score=score, red_flags=len(red_flags), warnings=len(warnings))
         return True
     
     return False
 
 
+# ============================================================
+# CRISIS RESPONSE - What /process returns instead of an atmosphere
+# ============================================================
+
+# Built once and serialized once per lexicon version (crisis_body()), so an
+# intercepted entry costs one lexicon scan and nothing else
+CRISIS_RESPONSE = {
+    "crisis": True,
+    "message": (
+        "It sounds like you are carrying some heavy feelings right now. "
+        "You don't have to navigate this alone. Help is available 24/7, free and confidential."
+    ),
+    "resources": [
+        {"name": "Suicide & Crisis Lifeline", "contact": "Call or text 988", "url": "https://988lifeline.org"},
+        {"name": "Crisis Text Line", "contact": "Text HELLO to 741741", "url": "https://www.crisistextline.org"},
+        {"name": "988 Lifeline Chat", "contact": "Chat online", "url": "https://988lifeline.org/chat/"},
+        {"name": "Emergency Services", "contact": "Call 911 if you are in immediate danger", "url": None},
+    ],
+    "score": 0,
+    "intent": None,
+    "weather": None,
+    "heat_level": None
+}
+
+_crisis_bodies = {}
+
+
+def crisis_body(lexicon_version):
+    """
+    CRISIS_RESPONSE plus the lexicon version that flagged the entry, as
+    UTF-8 JSON. Serialized once per lexicon version.
+    """
+    body = _crisis_bodies.get(lexicon_version)
+    if body is None:
+        body = json.dumps(dict(CRISIS_RESPONSE, lexicon_version=lexicon_version)).encode("utf-8")
+        _crisis_bodies[lexicon_version] = body
+    return body
+
+
 def display_crisis_resources():
     """
     Displays crisis resources in a clear, empathetic format.
@@ -160,6 +189,9 @@ def display_crisis_resources():
 # ============================================================
 
 if __name__ == "__main__":
+    # Trace every check, as the old prints did
+    configure(level="DEBUG", sample_rate=1.0)
+    
     print("=" * 60)
     print("    INNERVERSE SECURITY MODULE - CRISIS DETECTION TEST")
     print("=" * 60)
@@ -0,0 +1,281 @@
+"""
+FILE: state_store.py
+PURPOSE: Keeps each user's house state (heat + last update time) in memory
+         and writes it to disk in the background.
+NOTES:
+- Users are spread over a fixed number of shards, each with its own lock
+  and its own file, so requests for different users don't wait on each other
+- /process only touches memory; dirty shards are flushed on a timer and
+  once more when the server shuts down
+- Several server processes can share the directory: a flush locks the
+  shard file, merges in whatever other processes wrote (newest update
+  wins per user) and replaces it atomically
+- The stored heat is the heat at updated_at. With a decay function
+  (engine.decayed_heat) get() and update() see the heat as it is now, so
+  a cooling house needs no writes
+- Threads don't survive a fork: a store started before the server forks
+  its workers (gunicorn --preload) restarts its flush thread in each one
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+import weakref
+import zlib
+from pathlib import Path
+
+from logs import get_logger
+from metrics import METRICS
+from utils.atomic import atomic_write_json, file_lock, file_version
+
+
+LOG = get_logger("state")
+
+# Directory holding one JSON file per shard
+STATE_DIR = Path("house_state")
+
+# Old single-user state file, imported as the default user on first start
+LEGACY_STATE_FILE = Path("house_state.json")
+
+SHARD_COUNT = 16
+FLUSH_INTERVAL = 2.0  # seconds between background flushes
+DEFAULT_USER = "default"
+
+
+class HouseStateStore:
+    """
+    Per-user heat store with write-behind persistence.
+
+    Each entry looks like: {"heat": 0.0, "updated_at": <unix time>}
+
+    Args:
+        decay: Optional decay(heat, updated_at, now) -> heat now
+               (engine.decayed_heat); without it the heat never changes
+               on its own
+    """
+
+    def __init__(self, state_dir=STATE_DIR, shard_count=SHARD_COUNT, flush_interval=FLUSH_INTERVAL, decay=None):
+        self.state_dir = Path(state_dir)
+        self.shard_count = shard_count
+        self.flush_interval = flush_interval
+        self.decay = decay
+
+        self._shards = [{} for _ in range(shard_count)]
+        self._locks = [threading.Lock() for _ in range(shard_count)]
+        self._dirty = set()
+        self._dirty_lock = threading.Lock()
+        self._seen_versions = {}  # shard index -> file_version() last read or written
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        _instances.add(self)
+
+        self._load()
+
+    # --------------------------------------------------------
+    # Request path (memory only)
+    # --------------------------------------------------------
+
+    def get(self, user_id, now=None):
+        """
+        Returns a copy of the user's state (heat 0.0 if never seen), with
+        the heat decayed to `now` (default: the current time).
+        """
+        index = self._shard_index(user_id)
+        with self._locks[index]:
+            state = self._shards[index].get(user_id)
+            state = dict(state) if state else {"heat": 0.0, "updated_at": None}
+        state["heat"] = self._current(state, now)
+        return state
+
+    def set(self, user_id, heat):
+        """Overwrites the user's heat."""
+        return self.update(user_id, lambda _: heat)
+
+    def update(self, user_id, change):
+        """
+        Atomically applies change(current_heat) -> new_heat for one user.
+        current_heat is the decayed heat as of now.
+
+        Only the user's shard is locked while `change` runs.
+
+        Returns:
+            float: The new heat value
+        """
+        index = self._shard_index(user_id)
+        now = time.time()
+        with self._locks[index]:
+            state = self._shards[index].get(user_id) or {"heat": 0.0}
+            heat = change(self._current(state, now))
+            self._shards[index][user_id] = {"heat": heat, "updated_at": now}
+
+        with self._dirty_lock:
+            self._dirty.add(index)
+
+        return heat
+
+    def _current(self, state, now):
+        if self.decay is None:
+            return state["heat"]
+        return self.decay(state["heat"], state.get("updated_at"), now)
+
+    # --------------------------------------------------------
+    # Persistence (background)
+    # --------------------------------------------------------
+
+    def start(self):
+        """Starts the background flush thread and registers the shutdown flush."""
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(target=self._run, name="house-state-flush", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def close(self):
+        """Stops the background thread and writes any pending changes."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 1)
+        self.flush()
+
+    @METRICS.timed("state_flush")
+    def flush(self):
+        """
+        Writes every dirty shard to disk.
+
+        Returns:
+            int: Number of shard files written
+        """
+        with self._flush_lock:
+            with self._dirty_lock:
+                dirty, self._dirty = self._dirty, set()
+
+            written = 0
+            for index in sorted(dirty):
+                with self._locks[index]:
+                    snapshot = {user: dict(state) for user, state in self._shards[index].items()}
+                try:
+                    self._write_shard(index, snapshot)
+                    written += 1
+                except OSError as e:
+                    LOG.error("state_flush_failed", shard=index, error=str(e))
+                    with self._dirty_lock:
+                        self._dirty.add(index)
+
+            return written
+
+    def refresh(self):
+        """
+        Picks up shard files that other processes have written since we last
+        looked (newest update wins per user).
+
+        Returns:
+            int: Number of shard files re-read
+        """
+        refreshed = 0
+        for index in range(self.shard_count):
+            path = self._shard_path(index)
+            version = file_version(path)
+            if version is None or version == self._seen_versions.get(index):
+                continue
+            data = self._read_shard(path)
+            self._seen_versions[index] = version
+            if data:
+                self._adopt_newer(index, data)
+                refreshed += 1
+        return refreshed
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            self.refresh()
+
+    def _after_fork(self):
+        # A lock held by a parent thread at fork time would stay held forever
+        self._locks = [threading.Lock() for _ in range(self.shard_count)]
+        self._dirty_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        if self._thread is not None and not self._stop.is_set():
+            # The inherited atexit registration still runs close() here
+            self._thread = threading.Thread(target=self._run, name="house-state-flush", daemon=True)
+            self._thread.start()
+
+    def _adopt_newer(self, index, data):
+        with self._locks[index]:
+            shard = self._shards[index]
+            for user, state in data.items():
+                mine = shard.get(user)
+                if mine is None or (mine.get("updated_at") or 0) < (state.get("updated_at") or 0):
+                    shard[user] = state
+
+    def _shard_index(self, user_id):
+        # crc32 is stable across processes, unlike hash()
+        return zlib.crc32(user_id.encode("utf-8")) % self.shard_count
+
+    def _shard_path(self, index):
+        return self.state_dir / f"shard_{index:02d}.json"
+
+    def _write_shard(self, index, snapshot):
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        path = self._shard_path(index)
+
+        with file_lock(path):
+            # Keep users (or newer updates) written by other processes
+            on_disk = self._read_shard(path) or {}
+            merged = dict(on_disk)
+            for user, state in snapshot.items():
+                theirs = on_disk.get(user)
+                if theirs is None or (theirs.get("updated_at") or 0) <= (state.get("updated_at") or 0):
+                    merged[user] = state
+            atomic_write_json(path, merged)
+            self._seen_versions[index] = file_version(path)
+
+        # Adopt the newer values we just read
+        self._adopt_newer(index, merged)
+
+    def _read_shard(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError):
+            LOG.warning("state_shard_unreadable", path=str(path))
+            return None
+        return data if isinstance(data, dict) else None
+
+    @METRICS.timed("state_load")
+    def _load(self):
+        """Reads all shard files, importing the legacy single-user file if needed."""
+        found_any = False
+
+        for index in range(self.shard_count):
+            path = self._shard_path(index)
+            self._seen_versions[index] = file_version(path)
+            data = self._read_shard(path)
+            if data is not None:
+                self._shards[index] = data
+                found_any = True
+
+        if not found_any and LEGACY_STATE_FILE.exists():
+            try:
+                with open(LEGACY_STATE_FILE, "r") as f:
+                    heat = float(json.load(f).get("heat", 0.0))
+            except (OSError, ValueError, AttributeError):
+                return
+            self.set(DEFAULT_USER, heat)
+
+
+_instances = weakref.WeakSet()
+
+
+def _restart_in_child():
+    for store in list(_instances):
+        store._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_in_child)
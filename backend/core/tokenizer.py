@@ -0,0 +1,309 @@
+"""
+FILE: tokenizer.py
+PURPOSE: One normalization of an entry, and the word tokens in it, shared by
+         every lexicon lookup (intent, intensity, red flags, warnings).
+NOTES:
+- normalize() lowercases and folds typographic apostrophes and hyphens
+  ("I’m", "self-harm" -> "i'm", "self harm") without changing the length
+  of the text, so match positions still line up with the original
+- A token is a run of letters/digits, with apostrophes allowed inside it
+  ("don't", "i'm"); everything else separates tokens
+- Lexicon phrases only count where they start and end on a token
+  boundary: "so" no longer matches "also" or "reason", "very" no longer
+  matches "every". A phrase written with a trailing * ("i hate*") may end
+  inside a word ("i hated")
+- The phrase matcher still runs over characters (live.py and incremental.py
+  resume it mid-text); boundary_hits() then keeps the hits that sit on
+  token boundaries, which costs a couple of character checks per hit
+- Negation scope ("i'm not angry"): negators are lexicon phrases, found by
+  the same matcher pass; in_negation_scope() only looks at the few
+  characters between a negator and the phrase after it
+"""
+
+import re
+from itertools import product
+
+
+# Folded to their plain form by normalize(); one character for one.
+# (A chain of str.replace is ~100x faster than str.translate here.)
+_FOLD = (
+    ("’", "'"),  # right single quote (phone keyboards)
+    ("‘", "'"),  # left single quote
+    ("ʼ", "'"),  # modifier letter apostrophe
+    ("-", " "),
+    ("‐", " "),  # hyphen
+    ("‑", " "),  # non-breaking hyphen
+)
+
+TOKEN = re.compile(r"[^\W_]+(?:'[^\W_]+)*")
+
+# Punctuation that ends a clause, and with it any negation scope
+CLAUSE_BREAK = re.compile(r"[.,;:!?()\[\]\"–—]")
+
+
+def normalize(text):
+    """
+    The form of `text` every lexicon scan runs on.
+
+    Returns:
+        str: Lowercased, apostrophes and hyphens folded. Same length as
+             text.lower()
+    """
+    text = text.lower()
+    for old, new in _FOLD:
+        text = text.replace(old, new)
+    return text
+
+
+def tokenize(clean_text):
+    """
+    Splits normalized text into word tokens.
+
+    Returns:
+        list: Token strings, in order ("don't", "i'm" stay one token)
+    """
+    return TOKEN.findall(clean_text)
+
+
+# ============================================================
+# TOKEN BOUNDARIES
+# ============================================================
+
+def is_boundary(text, position):
+    """
+    True if no token of `text` (see TOKEN) spans `position`, i.e. a token
+    could start or end there.
+    """
+    if position <= 0 or position >= len(text):
+        return True
+    left, right = text[position - 1], text[position]
+    if left.isalnum():
+        return not (right.isalnum() or (right == "'" and position + 1 < len(text) and text[position + 1].isalnum()))
+    return not (left == "'" and right.isalnum() and position >= 2 and text[position - 2].isalnum())
+
+
+def boundary_hits(hits, text, prefixes=()):
+    """
+    The hits that start and end on token boundaries, minus any that lie
+    inside an "exclude" hit (lexicon.json "exclusions") and the exclude
+    hits themselves.
+
+    Args:
+        hits: matcher.Hit list with positions in `text`
+        prefixes: (phrase, tag) pairs allowed to end inside a token
+
+    Returns:
+        list: The hits that count, in their original order
+    """
+    length = len(text)
+    kept = []
+    for hit in hits:
+        start, end = hit.start, hit.end
+        # Fast path: a space, punctuation or the text's edge on both sides
+        before = text[start - 1] if start else " "
+        after = text[end] if end < length else " "
+        if not (before.isalnum() or before == "'" or after.isalnum() or after == "'"):
+            kept.append(hit)
+        elif is_boundary(text, start) and (is_boundary(text, end) or (hit.phrase, hit.tag) in prefixes):
+            kept.append(hit)
+
+    excluded = [(hit.start, hit.end) for hit in kept if hit.tag[0] == "exclude"]
+    if excluded:
+        kept = [
+            hit for hit in kept
+            if hit.tag[0] != "exclude"
+            and not any(start <= hit.start and hit.end <= end for start, end in excluded)
+        ]
+    return kept
+
+
+def in_negation_scope(text, negation, hit, window, breaks=()):
+    """
+    True if `negation` (a matcher.Hit of a negator) negates `hit`: the
+    negator comes first, and at most `window` tokens separate the two,
+    with no clause break in between ("not angry", "never really angry",
+    but not "not tired, just angry" or "not tired but angry").
+
+    Args:
+        text: The normalized text both hits are in
+        window: Most tokens allowed between the negator and the phrase
+        breaks: Words that end the scope ("but", "though", ...)
+    """
+    if negation.end > hit.start:
+        return False
+    gap = text[negation.end:hit.start]
+    if CLAUSE_BREAK.search(gap):
+        return False
+    words = TOKEN.findall(gap)
+    return len(words) <= window and not any(word in breaks for word in words)
+
+
+def phrase_variants(phrase, contractions):
+    """
+    Every way of writing a lexicon phrase, given the contraction table
+    from lexicon.json ({"can't": ["cannot", "can not", "cant"], ...}).
+
+    Returns:
+        list: The phrase itself first, then its variants
+    """
+    options = [[word] + contractions.get(word, []) for word in phrase.split(" ")]
+    variants = [" ".join(words) for words in product(*options)]
+    return list(dict.fromkeys(variants))
+
+
+# ============================================================
+# TESTING INTERFACE - Regression corpus, accuracy and latency
+# ============================================================
+
+if __name__ == "__main__":
+    import json
+    import random
+    import sys
+    import time
+    from pathlib import Path
+
+    from engine import _intent_from_scan, _multiplier_from_scan
+    from lexicon import LEXICON, LEXICON_FILE, Scan, compile_lexicon
+    from matcher import PhraseMatcher
+    from security import check_for_crisis
+
+    lexicon = LEXICON.current
+
+    print("=" * 60)
+    print("    TOKENIZER - BOUNDARIES, NEGATION, CORPUS AND LATENCY")
+    print("=" * 60)
+
+    # is_boundary() must agree with TOKEN everywhere
+    rng = random.Random(3)
+    alphabet = "ab'’ -.,!\n_9é"
+    for _ in range(3000):
+        text = normalize("".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12))))
+        inside = {p for match in TOKEN.finditer(text) for p in range(match.start() + 1, match.end())}
+        for position in range(len(text) + 1):
+            if is_boundary(text, position) == (position in inside):
+                print(f"✗ FAIL - is_boundary({text!r}, {position})")
+                sys.exit(1)
+    print("✓ PASS - is_boundary() agrees with the tokenizer")
+
+    # Substring matching as it was before: lowercase only, no boundaries,
+    # no contraction variants, despair words from str.split()
+    legacy_matcher = PhraseMatcher()
+    for emotion, patterns in lexicon.intent_patterns.items():
+        for pattern in patterns:
+            legacy_matcher.add(pattern, ("intent", emotion))
+    for multiplier, words in lexicon.intensity_modifiers:
+        for word in words:
+            legacy_matcher.add(word, ("intensity", multiplier))
+    for flag in lexicon.red_flags:
+        legacy_matcher.add(flag, ("red_flag", flag))
+    for phrase in lexicon.warning_phrases:
+        legacy_matcher.add(phrase, ("warning", phrase))
+    legacy_matcher.build()
+
+    def legacy_scan(text):
+        return Scan(legacy_matcher.scan(text.lower()), lexicon, text.lower())
+
+    def legacy_crisis(text):
+        clean_text = text.strip().lower()
+        words = clean_text.split()
+        found = legacy_scan(clean_text)
+        score = 5 * len(found.labels("red_flag")) + 2 * len(found.labels("warning"))
+        if len(words) > 40 and "." not in clean_text and "," not in clean_text:
+            score += 3
+        if "!!!" in text or "???" in text:
+            score += 2
+        despair_words = ["no", "never", "done", "stop", "end", "nothing", "nowhere"]
+        if len(words) < 5 and any(word in words for word in despair_words):
+            score += 3
+        return score >= 5
+
+    # The same lexicon without its negation section
+    with open(LEXICON_FILE, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    config.pop("negation", None)
+    plain = compile_lexicon(config)
+
+    def plain_scan(text):
+        return plain.scan(normalize(text))
+
+    def plain_crisis(text):
+        return check_for_crisis(text, plain)
+
+    def token_scan(text):
+        return lexicon.scan(normalize(text))
+
+    corpus_file = Path(__file__).with_name("lexicon_cases.json")
+    with open(corpus_file, "r", encoding="utf-8") as f:
+        cases = json.load(f)["cases"]
+
+    def score(scan_fn, crisis_fn):
+        right = {"intent": 0, "multiplier": 0, "crisis": 0}
+        wrong = []
+        for case in cases:
+            text = case["text"].strip()
+            found = scan_fn(text)
+            got = {
+                "intent": _intent_from_scan(found),
+                "multiplier": _multiplier_from_scan(found),
+                "crisis": crisis_fn(text),
+            }
+            for field in right:
+                if field in case and got[field] == case[field]:
+                    right[field] += 1
+                elif field in case:
+                    wrong.append((case["text"], field, case[field], got[field]))
+        return right, wrong
+
+    totals = {field: sum(field in case for case in cases) for field in ("intent", "multiplier", "crisis")}
+    substring, _ = score(legacy_scan, legacy_crisis)
+    tokens_only, _ = score(plain_scan, plain_crisis)
+    negation, wrong = score(token_scan, check_for_crisis)
+    print(f"\nLabelled corpus: {len(cases)} entries ({corpus_file.name}), correct:")
+    print(f"{'':<12}{'substring':>12}{'token':>12}{'+negation':>12}")
+    for field, total in totals.items():
+        print(f"{field:<12}" + "".join(f"{f'{result[field]}/{total}':>12}" for result in (substring, tokens_only, negation)))
+    for text, field, expected, got in wrong:
+        print(f"  ✗ {field}: {text!r} expected {expected!r}, got {got!r}")
+    if wrong:
+        sys.exit(1)
+    print("✓ PASS - every labelled entry classified as expected")
+
+    def bench(fn, texts, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for text in texts:
+                fn(text)
+        return (time.perf_counter() - start) / (repeat * len(texts)) * 1e6
+
+    texts = [case["text"] for case in cases]
+    negated = [case["text"] for case in cases if token_scan(case["text"]).labels("negation")]
+    long_entry = [" ".join(texts) * 10]
+    batches = (
+        ("corpus entries", texts, 200),
+        (f"entries with negators ({len(negated)})", negated, 200),
+        (f"{len(long_entry[0])}-char entry", long_entry, 20),
+    )
+
+    # Throughput: the scan alone, then the scan plus the word list the
+    # crisis check needs (str.split() before, tokens now)
+    def legacy_scan_and_words(text):
+        legacy_scan(text)
+        text.lower().split()
+
+    def token_scan_and_words(text):
+        token_scan(text).tokens()
+
+    print(f"\n{'µs per entry':<28}{'scan':>20}{'scan + words':>24}")
+    print(f"{'':<28}{'substring':>10}{'token':>10}{'substring':>12}{'token':>12}")
+    for label, batch, repeat in batches:
+        print(f"{label:<28}"
+              f"{bench(legacy_scan, batch, repeat):>10.1f}{bench(token_scan, batch, repeat):>10.1f}"
+              f"{bench(legacy_scan_and_words, batch, repeat):>12.1f}{bench(token_scan_and_words, batch, repeat):>12.1f}")
+
+    # Per-entry latency of intent detection (scan + pick the intent)
+    print(f"\n{'µs per entry, intent':<28}{'substring':>10}{'token':>10}{'+negation':>10}")
+    for label, batch, repeat in batches:
+        print(f"{label:<28}"
+              f"{bench(lambda text: _intent_from_scan(legacy_scan(text)), batch, repeat):>10.1f}"
+              f"{bench(lambda text: _intent_from_scan(plain_scan(text)), batch, repeat):>10.1f}"
+              f"{bench(lambda text: _intent_from_scan(token_scan(text)), batch, repeat):>10.1f}")
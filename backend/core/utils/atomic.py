@@ -0,0 +1,302 @@
+"""
+FILE: atomic.py (utils/atomic.py)
+PURPOSE: Safe file writes shared by the journal (storage.py) and the house state
+         (state_store.py), so several server workers or a crash mid-write
+         can't lose updates or leave a half-written file behind.
+TOOLS:
+- file_lock(path): advisory inter-process lock (a "<path>.lock" file)
+- atomic_write(path, data): temp file + fsync + rename; readers see either
+  the old file or the new one, never a mix
+- file_version / write_if_unchanged: optimistic checks for code that
+  reads a file without holding the lock and writes it back later
+"""
+
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+
+    def _lock_fd(fd):
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def _unlock_fd(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+except ImportError:
+    # Windows: lock the first byte of the lock file instead
+    import msvcrt
+
+    def _lock_fd(fd):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+
+    def _unlock_fd(fd):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class VersionConflict(Exception):
+    """The file changed between reading it and writing it back."""
+
+
+# One in-process lock per lock file, plus the open fd and nesting depth while
+# held. This makes file_lock() re-entrant within a process (flock would
+# otherwise deadlock against our own second descriptor).
+_registry_lock = threading.Lock()
+_thread_locks = {}
+_held = {}
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Holds an exclusive advisory lock for `path` across processes and threads.
+
+    Re-entrant: code already holding the lock can call functions that take
+    it again.
+    """
+    lock_path = f"{os.path.abspath(path)}.lock"
+
+    with _registry_lock:
+        thread_lock = _thread_locks.setdefault(lock_path, threading.RLock())
+
+    with thread_lock:
+        state = _held.get(lock_path)
+        if state is None:
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                _lock_fd(fd)
+            except BaseException:
+                os.close(fd)
+                raise
+            state = _held[lock_path] = [fd, 0]
+
+        state[1] += 1
+        try:
+            yield
+        finally:
+            state[1] -= 1
+            if state[1] == 0:
+                del _held[lock_path]
+                _unlock_fd(state[0])
+                os.close(state[0])
+
+
+def atomic_write(path, data, fsync=True):
+    """
+    Replaces `path` with `data` (str or bytes) in one step.
+
+    The data goes to a temp file in the same directory, is flushed (and
+    fsync'd unless fsync=False), then renamed over the target.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    mode = "wb" if isinstance(data, bytes) else "w"
+
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, mode, **({} if mode == "wb" else {"encoding": "utf-8"})) as file:
+            file.write(data)
+            file.flush()
+            if fsync:
+                os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+    if fsync:
+        _fsync_directory(directory)
+
+
+def atomic_write_json(path, obj, fsync=True, **dump_kwargs):
+    """atomic_write() for a JSON-serializable object."""
+    atomic_write(path, json.dumps(obj, **dump_kwargs), fsync=fsync)
+
+
+def file_version(path):
+    """
+    Returns a token that changes whenever the file is replaced or written.
+
+    Returns:
+        tuple: (inode, size, mtime in ns), or None if the file doesn't exist
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def write_if_unchanged(path, data, expected_version, fsync=True):
+    """
+    atomic_write() that refuses to overwrite changes made since reading.
+
+    Args:
+        expected_version: file_version(path) taken when the file was read
+
+    Raises:
+        VersionConflict: If the file's version is no longer expected_version
+    """
+    with file_lock(path):
+        if file_version(path) != expected_version:
+            raise VersionConflict(path)
+        atomic_write(path, data, fsync=fsync)
+
+
+def read_json_versioned(path, default=None):
+    """
+    Reads a JSON file together with its version.
+
+    Returns:
+        tuple: (data, version) - (default, None) if the file doesn't exist
+    """
+    with file_lock(path):
+        version = file_version(path)
+        if version is None:
+            return default, None
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file), version
+
+
+def _fsync_directory(directory):
+    """Makes the rename itself durable (no-op where directories can't be opened)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+# ============================================================
+# STRESS TEST
+# ============================================================
+
+def _locked_counter_worker(path, rounds):
+    for _ in range(rounds):
+        with file_lock(path):
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            data["count"] += 1
+            atomic_write_json(path, data, fsync=False)
+
+
+def _optimistic_counter_worker(path, rounds):
+    done = 0
+    while done < rounds:
+        data, version = read_json_versioned(path)
+        data["count"] += 1
+        try:
+            write_if_unchanged(path, json.dumps(data), version, fsync=False)
+            done += 1
+        except VersionConflict:
+            continue  # someone else won; re-read and retry
+
+
+def _journal_worker(directory, rounds):
+    os.chdir(directory)
+    import storage
+    for i in range(rounds):
+        if not storage.save_entry("FOGGY MIST", 0.0, f"stress {os.getpid()} {i}"):
+            raise RuntimeError("save_entry failed")
+
+
+def _reader_worker(path, stop):
+    # Every read must see a complete JSON document
+    while not stop.is_set():
+        with open(path, "r", encoding="utf-8") as file:
+            json.load(file)
+
+
+def run_stress_test(processes=8, rounds=200):
+    """
+    Hammers the locking and atomic-write layer from many processes.
+
+    Returns:
+        dict: Expected and actual totals for each scenario
+    """
+    import multiprocessing
+    import shutil
+
+    directory = tempfile.mkdtemp(prefix="innerverse_stress_")
+    results = {}
+
+    try:
+        for name, worker in (("locked", _locked_counter_worker), ("optimistic", _optimistic_counter_worker)):
+            path = os.path.join(directory, f"{name}.json")
+            atomic_write_json(path, {"count": 0})
+
+            stop = multiprocessing.Event()
+            reader = multiprocessing.Process(target=_reader_worker, args=(path, stop))
+            reader.start()
+
+            workers = [multiprocessing.Process(target=worker, args=(path, rounds)) for _ in range(processes)]
+            for p in workers:
+                p.start()
+            for p in workers:
+                p.join()
+
+            stop.set()
+            reader.join()
+
+            with open(path, "r", encoding="utf-8") as file:
+                count = json.load(file)["count"]
+            results[name] = {
+                "expected": processes * rounds,
+                "actual": count,
+                "reader_ok": reader.exitcode == 0
+            }
+
+        # The journal itself: every append and the aggregates must survive
+        journal_rounds = max(1, rounds // 4)
+        workers = [multiprocessing.Process(target=_journal_worker, args=(directory, journal_rounds))
+                   for _ in range(processes)]
+        for p in workers:
+            p.start()
+        for p in workers:
+            p.join()
+
+        os.chdir(directory)
+        import storage
+        storage._stats = None
+        results["journal"] = {
+            "expected": processes * journal_rounds,
+            "actual": len(storage.load_history()),
+            "aggregate_count": storage.get_entry_count()
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    print("=" * 60)
+    print("    ATOMIC WRITE LAYER - MULTI-PROCESS STRESS TEST")
+    print("=" * 60)
+
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    results = run_stress_test(processes, rounds)
+
+    all_ok = True
+    for name, result in results.items():
+        ok = result["expected"] == result["actual"] == result.get("aggregate_count", result["actual"])
+        ok = ok and result.get("reader_ok", True)
+        all_ok = all_ok and ok
+        print(f"{'✓ PASS' if ok else '✗ FAIL'} - {name}: {result}")
+
+    print("=" * 60)
+    sys.exit(0 if all_ok else 1)
@@ -0,0 +1,171 @@
+"""
+FILE: sqlite_backend.py (utils/sqlite_backend.py)
+PURPOSE: SQLite storage backend for the journal, for deployments where several
+         server workers read and write the same history.
+NOTES:
+- WAL mode: readers never block the writer and vice versa; writers queue
+  up on SQLite's own lock (busy timeout) instead of clobbering each other
+- Every query is a fixed SQL string with parameters, so sqlite3 keeps it
+  prepared in its per-connection statement cache
+- Enable with INNERVERSE_STORAGE=sqlite (see storage.get_backend)
+"""
+
+import json
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime
+
+try:
+    from utils.storage import StorageBackend
+except ImportError:
+    from storage import StorageBackend  # running from inside utils/
+
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS entries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ts REAL NOT NULL,
+        weather TEXT NOT NULL,
+        score REAL NOT NULL,
+        data TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_entries_ts ON entries (ts)",
+    "CREATE INDEX IF NOT EXISTS idx_entries_weather ON entries (weather)",
+]
+
+INSERT_ENTRY = "INSERT INTO entries (ts, weather, score, data) VALUES (?, ?, ?, ?)"
+SELECT_ALL = "SELECT data FROM entries ORDER BY id"
+SELECT_RECENT = "SELECT data FROM entries ORDER BY id DESC LIMIT ?"
+SELECT_RANGE = "SELECT data FROM entries WHERE ts >= ? AND ts < ? ORDER BY ts, id"
+SELECT_TOTALS = "SELECT COUNT(*), TOTAL(score) FROM entries"
+SELECT_WEATHER_COUNTS = "SELECT weather, COUNT(*) FROM entries GROUP BY weather"
+SELECT_ANY = "SELECT 1 FROM entries LIMIT 1"
+DELETE_ALL = "DELETE FROM entries"
+
+BUSY_TIMEOUT = 30.0  # seconds a writer waits for another writer to finish
+
+
+class SqliteBackend(StorageBackend):
+    """Journal entries in one SQLite table, indexed on timestamp and weather."""
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        # sqlite3 connections can't be shared between threads
+        self._local = threading.local()
+
+        conn = self._connection()
+        for statement in SCHEMA:
+            conn.execute(statement)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=BUSY_TIMEOUT,
+                isolation_level=None,  # autocommit; each INSERT is its own transaction
+                cached_statements=64,
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --------------------------------------------------------
+    # StorageBackend interface
+    # --------------------------------------------------------
+
+    def load_all(self):
+        return [json.loads(row[0]) for row in self._connection().execute(SELECT_ALL)]
+
+    def append(self, entry):
+        self._connection().execute(INSERT_ENTRY, _row_for(entry))
+
+    def recent(self, count):
+        rows = self._connection().execute(SELECT_RECENT, (count,)).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def range(self, start_ts, end_ts):
+        rows = self._connection().execute(SELECT_RANGE, (start_ts, end_ts))
+        return [json.loads(row[0]) for row in rows]
+
+    def totals(self):
+        conn = self._connection()
+        count, score_sum = conn.execute(SELECT_TOTALS).fetchone()
+        return {
+            "count": count,
+            "score_sum": score_sum,
+            "weather_counts": dict(conn.execute(SELECT_WEATHER_COUNTS).fetchall())
+        }
+
+    def clear(self):
+        conn = self._connection()
+
+        # Create backup before clearing
+        backup_path = f"journal_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
+        try:
+            # closing(): a connection's own `with` only commits, it doesn't close
+            with closing(sqlite3.connect(backup_path)) as backup:
+                conn.backup(backup)
+            print(f"Backup created: {backup_path}")
+        except Exception as e:
+            print(f"Could not create backup: {e}")
+
+        conn.execute(DELETE_ALL)
+        print("History cleared.")
+
+    # --------------------------------------------------------
+    # Migration helpers
+    # --------------------------------------------------------
+
+    def is_empty(self):
+        return self._connection().execute(SELECT_ANY).fetchone() is None
+
+    def import_entries(self, entries, if_empty=False):
+        """
+        Bulk-inserts existing entries in one transaction.
+
+        Args:
+            if_empty: Only import into an empty database. The check runs
+                      inside the write transaction, so when several workers
+                      seed a new database at once exactly one of them does
+
+        Returns:
+            int: Number of entries imported
+        """
+        rows = [_row_for(entry) for entry in entries]
+        if not rows:
+            return 0
+
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if if_empty and conn.execute(SELECT_ANY).fetchone() is not None:
+                conn.execute("ROLLBACK")
+                return 0
+            conn.executemany(INSERT_ENTRY, rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        return len(rows)
+
+
+def _row_for(entry):
+    """Turns an entry dict into an INSERT_ENTRY parameter tuple."""
+    try:
+        ts = datetime.fromisoformat(entry["timestamp"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        ts = 0.0
+
+    return (
+        ts,
+        entry.get("weather", "UNKNOWN"),
+        entry.get("score", 0),
+        json.dumps(entry, ensure_ascii=False),
+    )
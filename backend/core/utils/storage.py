@@ -6,44 +6,73 @@ FIXED ISSUES:
 - Better error handling
 - Added data retrieval functions
 - Improved file management
+- Switched to an append-only NDJSON log (one entry per line) so saving
+  no longer rewrites the whole history
+- Summary queries read rolling aggregates (journal_stats.json) instead of
+  re-parsing the whole log
+- Added real calendar-window queries (query_range, window_stats) backed by
+  an in-memory timestamp index
+- Storage goes through a pluggable backend (JSON log by default, or SQLite)
 """
 
+import bisect
 import json
 import os
-from datetime import datetime
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timedelta
 from pathlib import Path
 
+try:
+    from utils.atomic import VersionConflict, atomic_write, file_lock, file_version
+except ImportError:
+    from atomic import VersionConflict, atomic_write, file_lock, file_version  # running from inside utils/
 
-# File path for the journal storage
-FILE_PATH = "journal.json"
+
+# File path for the journal storage (newline-delimited JSON, append-only)
+FILE_PATH = "journal.ndjson"
+
+# Old single-array format, migrated into FILE_PATH on first use
+LEGACY_FILE_PATH = "journal.json"
+
+# Rolling aggregates kept next to the log so summaries never re-read it
+STATS_PATH = "journal_stats.json"
+
+# How many of the latest entries the aggregates keep (the ring buffer)
+RECENT_LIMIT = 100
+
+# Which backend stores the journal: "json" (the NDJSON log, default) or
+# "sqlite" (utils/sqlite_backend.py, for multi-worker deployments)
+STORAGE_BACKEND = os.environ.get("INNERVERSE_STORAGE", "json")
+
+# SQLite database file used when STORAGE_BACKEND is "sqlite"
+DB_PATH = "journal.db"
+
+_backend = None
+_migration_checked = False
+_stats = None  # in-memory copy of STATS_PATH
+
+# Sorted [(unix timestamp, byte offset of the entry's line), ...] and which
+# part of which log file (inode, bytes) it covers. Built on first use, then
+# extended with only the newly appended lines.
+_time_index = []
+_time_index_inode = None
+_time_index_size = 0
 
 
 def load_history():
     """
-    Loads the complete mood history from the JSON file.
+    Loads the complete mood history from the active storage backend.
     
     Returns:
         list: List of entry dictionaries, or empty list if no file exists
     """
-    if not os.path.exists(FILE_PATH):
-        return []
-    
-    try:
-        with open(FILE_PATH, "r", encoding="utf-8") as file:
-            data = json.load(file)
-            return data if isinstance(data, list) else []
-    except json.JSONDecodeError:
-        print(f"Warning: {FILE_PATH} is corrupted. Creating backup...")
-        _backup_corrupted_file()
-        return []
-    except Exception as e:
-        print(f"Error loading history: {e}")
-        return []
+    return get_backend().load_all()
 
 
 def save_entry(weather, score, user_text=None):
     """
-    Saves a new mood entry to the JSON file.
+    Saves a new mood entry to the active storage backend.
     
     Args:
         weather: String weather state (e.g., "RADIANT SUN")
@@ -51,8 +80,6 @@ def save_entry(weather, score, user_text=None):
         user_text: Optional string of user's journal entry (first 100 chars)
     """
     try:
-        history = load_history()
-        
         # Create a new entry with timestamp
         new_entry = {
             "timestamp": datetime.now().isoformat(),
@@ -64,11 +91,7 @@ def save_entry(weather, score, user_text=None):
         if user_text:
             new_entry["snippet"] = user_text[:100] + ("..." if len(user_text) > 100 else "")
         
-        history.append(new_entry)
-        
-        # Write back to the file
-        with open(FILE_PATH, "w", encoding="utf-8") as file:
-            json.dump(history, file, indent=4, ensure_ascii=False)
+        get_backend().append(new_entry)
         
         return True
     
@@ -77,6 +100,13 @@ def save_entry(weather, score, user_text=None):
         return False
 
 
+def get_entry_count():
+    """
+    Returns the total number of saved entries (without loading them).
+    """
+    return get_backend().totals()["count"]
+
+
 def get_recent_entries(count=5):
     """
     Retrieves the most recent N entries.
@@ -87,22 +117,24 @@ def get_recent_entries(count=5):
     Returns:
         list: List of the most recent entries
     """
-    history = load_history()
-    return history[-count:] if history else []
+    if count <= 0:
+        return []
+    
+    return get_backend().recent(count)
 
 
 def get_weather_pattern(days=7):
     """
-    Analyzes weather patterns over the last N days.
+    Analyzes weather patterns over the last N entries.
+    For a calendar window use window_stats(days).
     
     Args:
-        days: Number of days to analyze (default: 7)
+        days: Number of entries to analyze (default: 7)
     
     Returns:
         dict: Weather frequency counts
     """
-    history = load_history()
-    recent = history[-days:] if len(history) >= days else history
+    recent = get_recent_entries(days)
     
     weather_counts = {}
     for entry in recent:
@@ -114,16 +146,16 @@ def get_weather_pattern(days=7):
 
 def get_average_score(days=7):
     """
-    Calculates the average mood score over the last N days.
+    Calculates the average mood score over the last N entries.
+    For a calendar window use window_stats(days).
     
     Args:
-        days: Number of days to analyze (default: 7)
+        days: Number of entries to analyze (default: 7)
     
     Returns:
         float: Average score, or None if no data
     """
-    history = load_history()
-    recent = history[-days:] if len(history) >= days else history
+    recent = get_recent_entries(days)
     
     if not recent:
         return None
@@ -132,53 +164,598 @@ def get_average_score(days=7):
     return sum(scores) / len(scores) if scores else None
 
 
+def get_totals():
+    """
+    Returns all-time aggregates without loading the history.
+    
+    Returns:
+        dict: {"count", "average_score", "weather_counts"}
+    """
+    totals = get_backend().totals()
+    return {
+        "count": totals["count"],
+        "average_score": totals["score_sum"] / totals["count"] if totals["count"] else None,
+        "weather_counts": dict(totals["weather_counts"])
+    }
+
+
+def query_range(start, end=None):
+    """
+    Returns the entries saved between two points in time.
+    
+    Both backends answer this from an index on the timestamp, so the cost
+    is O(log n + k) rather than a scan of the whole history.
+    
+    Args:
+        start: datetime or ISO string (inclusive)
+        end: datetime or ISO string (exclusive); defaults to now
+    
+    Returns:
+        list: Matching entries, oldest first
+    """
+    start_ts = _to_timestamp(start)
+    end_ts = _to_timestamp(end) if end is not None else datetime.now().timestamp()
+    
+    return get_backend().range(start_ts, end_ts)
+
+
+def window_stats(days=7, now=None):
+    """
+    Summarizes the last N calendar days (not the last N entries).
+    
+    Args:
+        days: Size of the window in days (default: 7)
+        now: End of the window (default: current time)
+    
+    Returns:
+        dict: {"days", "count", "average_score", "weather_counts"}
+    """
+    now = now or datetime.now()
+    entries = query_range(now - timedelta(days=days), now)
+    
+    weather_counts = {}
+    for entry in entries:
+        weather = entry.get("weather", "UNKNOWN")
+        weather_counts[weather] = weather_counts.get(weather, 0) + 1
+    
+    scores = [entry.get("score", 0) for entry in entries]
+    
+    return {
+        "days": days,
+        "count": len(entries),
+        "average_score": sum(scores) / len(scores) if scores else None,
+        "weather_counts": weather_counts
+    }
+
+
 def clear_history():
     """
     Clears all history (creates a backup first).
     Use with caution!
     """
-    if os.path.exists(FILE_PATH):
-        # Create backup before clearing
-        backup_path = f"journal_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    get_backend().clear()
+
+
+# ============================================================
+# STORAGE BACKENDS
+# ============================================================
+
+class StorageBackend(ABC):
+    """
+    What a journal storage backend has to provide.
+    
+    Entries are plain dicts with at least "timestamp" (ISO string),
+    "weather" and "score". Timestamps passed to range() are unix times.
+    A subclass missing any of these methods can't be instantiated.
+    """
+    
+    name = None
+    
+    @abstractmethod
+    def load_all(self):
+        """Returns every entry, oldest first."""
+    
+    @abstractmethod
+    def append(self, entry):
+        """Stores one new entry."""
+    
+    @abstractmethod
+    def recent(self, count):
+        """Returns the newest `count` entries, oldest first."""
+    
+    @abstractmethod
+    def range(self, start_ts, end_ts):
+        """Returns entries with start_ts <= timestamp < end_ts, oldest first."""
+    
+    @abstractmethod
+    def totals(self):
+        """Returns {"count", "score_sum", "weather_counts"} for all entries."""
+    
+    @abstractmethod
+    def clear(self):
+        """Backs up, then deletes, every entry."""
+
+
+class JsonLogBackend(StorageBackend):
+    """
+    The default backend: the append-only NDJSON log (FILE_PATH), its
+    rolling aggregates (STATS_PATH) and the in-memory timestamp index.
+    """
+    
+    name = "json"
+    
+    def load_all(self):
+        return _load_log()
+    
+    def append(self, entry):
+        _ensure_migrated()
+        
+        # One writer at a time across processes, so the aggregates always
+        # describe exactly the lines in the log
+        with file_lock(FILE_PATH):
+            stats = _get_stats()
+            _append_line(json.dumps(entry, ensure_ascii=False))
+            
+            _add_to_stats(stats, entry)
+            stats["log_inode"], stats["log_size"] = _log_identity()
+            _write_stats(stats)
+    
+    def recent(self, count):
+        # Served from the aggregates' ring buffer when it is big enough
+        if count <= RECENT_LIMIT:
+            return list(_get_stats()["recent"])[-count:]
+        
+        history = _load_log()
+        return history[-count:] if history else []
+    
+    def range(self, start_ts, end_ts):
+        index = _refresh_time_index()
+        low = bisect.bisect_left(index, (start_ts,))
+        high = bisect.bisect_left(index, (end_ts,))
+        
+        if low >= high:
+            return []
+        
+        entries = []
+        with open(FILE_PATH, "rb") as file:
+            for _, offset in index[low:high]:
+                file.seek(offset)
+                entries.append(json.loads(file.readline()))
+        
+        return entries
+    
+    def totals(self):
+        stats = _get_stats()
+        return {
+            "count": stats["count"],
+            "score_sum": stats["score_sum"],
+            "weather_counts": stats["weather_counts"]
+        }
+    
+    def clear(self):
+        with file_lock(FILE_PATH):
+            if not os.path.exists(FILE_PATH):
+                return
+            
+            # Create backup before clearing
+            backup_path = f"journal_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson"
+            try:
+                import shutil
+                shutil.copy(FILE_PATH, backup_path)
+                print(f"Backup created: {backup_path}")
+            except Exception as e:
+                print(f"Could not create backup: {e}")
+            
+            # Clear the file
+            _write_log(FILE_PATH, [])
+            rebuild_aggregates()
+            
+            print("History cleared.")
+
+
+def get_backend():
+    """
+    Returns the active storage backend, creating it on first use.
+    
+    STORAGE_BACKEND picks it: "json" (default) or "sqlite". A new SQLite
+    database is seeded once from the existing JSON journal.
+    """
+    global _backend
+    
+    if _backend is None:
+        if STORAGE_BACKEND == "sqlite":
+            try:
+                from utils.sqlite_backend import SqliteBackend
+            except ImportError:
+                from sqlite_backend import SqliteBackend  # running from inside utils/
+            
+            backend = SqliteBackend(DB_PATH)
+            # is_empty() skips reading the log once the database is seeded;
+            # import_entries() checks again under the write lock, since
+            # other workers may be seeding the same database right now
+            if backend.is_empty():
+                imported = backend.import_entries(_load_log(), if_empty=True)
+                if imported:
+                    print(f"Imported {imported} entries from {FILE_PATH} into {DB_PATH}")
+            _backend = backend
+        elif STORAGE_BACKEND == "json":
+            _backend = JsonLogBackend()
+        else:
+            raise ValueError(f"Unknown storage backend: {STORAGE_BACKEND!r}")
+    
+    return _backend
+
+
+def set_backend(backend):
+    """Replaces the active storage backend (any StorageBackend)."""
+    global _backend
+    _backend = backend
+
+
+# ============================================================
+# JSON LOG MAINTENANCE
+# ============================================================
+
+def compact_log(history=None, expected_version=None):
+    """
+    Rewrites the journal log with only its valid entries.
+    
+    The new log is written to a temporary file and swapped in with
+    os.replace(), so a crash mid-compaction leaves the old log intact.
+    
+    Args:
+        history: Optional list of entries to write (defaults to the
+                 entries currently readable from the log)
+        expected_version: file_version() of the log when `history` was
+                          read; the rewrite is refused if it has changed
+    
+    Returns:
+        int: Number of entries in the compacted log
+    
+    Raises:
+        VersionConflict: If expected_version is given and the log changed
+    """
+    with file_lock(FILE_PATH):
+        if history is None:
+            history, _ = _read_log() if os.path.exists(FILE_PATH) else ([], 0)
+        elif file_version(FILE_PATH) != expected_version:
+            raise VersionConflict(FILE_PATH)
+        
+        _write_log(FILE_PATH, history)
+    
+    return len(history)
+
+
+def migrate_legacy_journal():
+    """
+    One-shot migration from the old journal.json array to the NDJSON log.
+    
+    Does nothing if the log already exists or there is no legacy file.
+    The legacy file is renamed (not deleted) once the log is in place.
+    
+    Returns:
+        int: Number of entries migrated
+    """
+    if os.path.exists(FILE_PATH) or not os.path.exists(LEGACY_FILE_PATH):
+        return 0
+    
+    with file_lock(FILE_PATH):
+        # Another process may have migrated while we waited for the lock
+        if os.path.exists(FILE_PATH) or not os.path.exists(LEGACY_FILE_PATH):
+            return 0
+        
         try:
-            import shutil
-            shutil.copy(FILE_PATH, backup_path)
-            print(f"Backup created: {backup_path}")
-        except Exception as e:
-            print(f"Could not create backup: {e}")
+            with open(LEGACY_FILE_PATH, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except json.JSONDecodeError:
+            print(f"Warning: {LEGACY_FILE_PATH} is corrupted. Creating backup...")
+            _backup_corrupted_file(LEGACY_FILE_PATH)
+            return 0
         
-        # Clear the file
-        with open(FILE_PATH, "w", encoding="utf-8") as file:
-            json.dump([], file)
+        history = [entry for entry in data if isinstance(entry, dict)] if isinstance(data, list) else []
+        _write_log(FILE_PATH, history)
+        
+        migrated_path = f"journal_migrated_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        os.replace(LEGACY_FILE_PATH, migrated_path)
+        print(f"Migrated {len(history)} entries to {FILE_PATH} (old file kept as {migrated_path})")
+    
+    return len(history)
+
+
+def rebuild_aggregates():
+    """
+    Recomputes the aggregates from the full log and saves them.
+    
+    Runs automatically when the stats file is missing or out of step with
+    the log (e.g. after a migration or an append from another process).
+    
+    Returns:
+        dict: The rebuilt aggregates
+    """
+    global _stats
+    
+    with file_lock(FILE_PATH):
+        stats = _empty_stats()
+        for entry in _load_log():
+            _add_to_stats(stats, entry)
         
-        print("History cleared.")
+        # Measured after _load_log(), which may have compacted the log
+        stats["log_inode"], stats["log_size"] = _log_identity()
+        _write_stats(stats)
+    
+    _stats = stats
+    
+    return stats
 
 
-def _backup_corrupted_file():
+def _load_log():
+    """
+    Internal function that loads every entry from the NDJSON log.
+    
+    Damaged lines (e.g. a write torn by a crash) are skipped, backed up,
+    and removed from the log by compacting it.
+    """
+    _ensure_migrated()
+    
+    if not os.path.exists(FILE_PATH):
+        return []
+    
+    try:
+        version = file_version(FILE_PATH)
+        history, damaged = _read_log()
+    except Exception as e:
+        print(f"Error loading history: {e}")
+        return []
+    
+    if damaged:
+        print(f"Warning: {FILE_PATH} has {damaged} damaged line(s). Creating backup...")
+        _backup_corrupted_file()
+        try:
+            compact_log(history, expected_version=version)
+        except VersionConflict:
+            pass  # another writer got there first; retried on the next load
+    
+    return history
+
+
+def _backup_corrupted_file(path=None):
     """Internal function to backup corrupted files."""
-    backup_path = f"journal_corrupted_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    path = path or FILE_PATH
+    suffix = Path(path).suffix
+    backup_path = f"journal_corrupted_{datetime.now().strftime('%Y%m%d_%H%M%S')}{suffix}"
     try:
         import shutil
-        shutil.copy(FILE_PATH, backup_path)
+        shutil.copy(path, backup_path)
         print(f"Corrupted file backed up to: {backup_path}")
     except Exception as e:
         print(f"Could not backup corrupted file: {e}")
 
 
+def _ensure_migrated():
+    """Internal function that runs the legacy migration once per process."""
+    global _migration_checked
+    if not _migration_checked:
+        migrate_legacy_journal()
+        _migration_checked = True
+
+
+def _read_log():
+    """
+    Internal function that parses the NDJSON log.
+    
+    Returns:
+        tuple: (list of entries, number of damaged lines skipped)
+    """
+    history = []
+    damaged = 0
+    
+    with open(FILE_PATH, "r", encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                damaged += 1
+                continue
+            if isinstance(entry, dict):
+                history.append(entry)
+            else:
+                damaged += 1
+    
+    return history, damaged
+
+
+def _append_line(line):
+    """
+    Internal function that appends one line to the log and fsyncs it.
+    
+    If the previous write was torn (no trailing newline), a newline is
+    written first so the new entry doesn't get glued onto the damaged one.
+    """
+    with open(FILE_PATH, "a+b") as file:
+        if file.tell() > 0:
+            file.seek(-1, os.SEEK_END)
+            if file.read(1) != b"\n":
+                line = "\n" + line
+        file.write((line + "\n").encode("utf-8"))
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def _log_identity():
+    """Internal function returning (inode, size) of the log, or (None, 0)."""
+    version = file_version(FILE_PATH)
+    return (version[0], version[1]) if version else (None, 0)
+
+
+def _empty_stats():
+    """Internal function returning blank aggregates."""
+    return {
+        "log_inode": None,
+        "log_size": 0,
+        "count": 0,
+        "score_sum": 0.0,
+        "weather_counts": {},
+        "recent": deque(maxlen=RECENT_LIMIT)
+    }
+
+
+def _add_to_stats(stats, entry):
+    """Internal function that folds one entry into the aggregates."""
+    weather = entry.get("weather", "UNKNOWN")
+    stats["count"] += 1
+    stats["score_sum"] += entry.get("score", 0)
+    stats["weather_counts"][weather] = stats["weather_counts"].get(weather, 0) + 1
+    stats["recent"].append(entry)
+
+
+def _get_stats():
+    """
+    Internal function returning aggregates that match the current log.
+    
+    The log's inode and byte size are recorded with the aggregates. If they
+    no longer match, another process changed the log: its saved aggregates
+    are picked up, lines it appended are folded in, and only a rewritten
+    log (new inode) forces a full rebuild.
+    """
+    global _stats
+    _ensure_migrated()
+    
+    identity = _log_identity()
+    
+    if _stats is None or _stats_identity(_stats) != identity:
+        _stats = _read_stats() or _stats
+    
+    if _stats is not None and _stats["log_inode"] == identity[0] and _stats["log_size"] < identity[1]:
+        _catch_up_stats(_stats)
+    
+    if _stats is None or _stats_identity(_stats) != identity:
+        return rebuild_aggregates()
+    
+    return _stats
+
+
+def _stats_identity(stats):
+    """Internal function returning the (inode, size) the aggregates describe."""
+    return stats["log_inode"], stats["log_size"]
+
+
+def _catch_up_stats(stats):
+    """Internal function that folds lines appended after stats["log_size"] into stats."""
+    offset = stats["log_size"]
+    with open(FILE_PATH, "rb") as file:
+        file.seek(offset)
+        for raw in file:
+            if not raw.endswith(b"\n"):
+                break
+            try:
+                entry = json.loads(raw)
+            except ValueError:
+                break  # damaged line: leave it to a full rebuild
+            if isinstance(entry, dict):
+                _add_to_stats(stats, entry)
+            offset += len(raw)
+    stats["log_size"] = offset
+
+
+def _read_stats():
+    """Internal function that loads STATS_PATH (None if missing or unreadable)."""
+    try:
+        with open(STATS_PATH, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        stats = _empty_stats()
+        stats.update({key: data[key] for key in ("log_inode", "log_size", "count", "score_sum", "weather_counts")})
+        stats["recent"].extend(data["recent"])
+        return stats
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_stats(stats):
+    """
+    Internal function that saves the aggregates.
+    
+    Not fsync'd: the file can always be rebuilt from the log.
+    """
+    data = dict(stats, recent=list(stats["recent"]))
+    try:
+        atomic_write(STATS_PATH, json.dumps(data, ensure_ascii=False), fsync=False)
+    except OSError as e:
+        print(f"Could not save journal aggregates: {e}")
+
+
+def _to_timestamp(value):
+    """Internal function turning a datetime or ISO string into unix time."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+def _refresh_time_index():
+    """
+    Internal function that brings the timestamp index up to date.
+    
+    Only lines appended since the last call are parsed. If the log was
+    rewritten (compacted or cleared elsewhere) the index is rebuilt.
+    """
+    global _time_index, _time_index_inode, _time_index_size
+    _ensure_migrated()
+    
+    inode, size = _log_identity()
+    if inode != _time_index_inode or size < _time_index_size:
+        _time_index, _time_index_inode, _time_index_size = [], inode, 0
+    if size == _time_index_size:
+        return _time_index
+    
+    offset = _time_index_size
+    with open(FILE_PATH, "rb") as file:
+        file.seek(offset)
+        for raw in file:
+            if not raw.endswith(b"\n"):
+                break  # still being written; index it next time
+            try:
+                timestamp = _to_timestamp(json.loads(raw)["timestamp"])
+            except (ValueError, KeyError, TypeError):
+                timestamp = None
+            
+            if timestamp is not None:
+                item = (timestamp, offset)
+                if _time_index and item < _time_index[-1]:
+                    bisect.insort(_time_index, item)  # clock went backwards
+                else:
+                    _time_index.append(item)
+            
+            offset += len(raw)
+    
+    _time_index_size = offset
+    return _time_index
+
+
+def _write_log(path, history):
+    """Internal function that atomically replaces the log with the given entries."""
+    global _time_index, _time_index_inode, _time_index_size
+    atomic_write(path, "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in history))
+    
+    # Byte offsets changed; the timestamp index has to be rebuilt
+    _time_index, _time_index_inode, _time_index_size = [], None, 0
+
+
 def display_history_summary():
     """
     Displays a formatted summary of the user's mood history.
     """
-    history = load_history()
+    total = get_entry_count()
     
-    if not history:
+    if not total:
         print("\nNo journal entries found yet.")
         return
     
     print("\n" + "=" * 60)
     print("  📊 YOUR INNERVERSE HISTORY")
     print("=" * 60)
-    print(f"\nTotal Entries: {len(history)}")
+    print(f"\nTotal Entries: {total}")
     
     # Recent entries
     print("\n--- RECENT ENTRIES ---")
@@ -203,13 +780,14 @@ def display_history_summary():
             print(f"  Entry: {entry['snippet']}")
     
     # Weather pattern
+    week = window_stats(7)
     print("\n--- 7-DAY WEATHER PATTERN ---")
-    pattern = get_weather_pattern(7)
+    pattern = week["weather_counts"]
     for weather, count in sorted(pattern.items(), key=lambda x: x[1], reverse=True):
-        print(f"  {weather}: {count} day(s)")
+        print(f"  {weather}: {count} entr{'y' if count == 1 else 'ies'}")
     
     # Average score
-    avg = get_average_score(7)
+    avg = week["average_score"]
     if avg is not None:
         print(f"\n--- 7-DAY AVERAGE SCORE ---")
         print(f"  {avg:.2f}")
@@ -1,5 +1,6 @@
 import os
 import json
+import sqlite3
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
@@ -8,14 +9,36 @@ from rich.panel import Panel
 # This logic looks for the file in the parent directory (core/) 
 # instead of the current directory (utils/)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-FILE_PATH = os.path.join(BASE_DIR, "journal.json")
+FILE_PATH = os.path.join(BASE_DIR, "journal.ndjson")
+LEGACY_FILE_PATH = os.path.join(BASE_DIR, "journal.json")
+DB_PATH = os.path.join(BASE_DIR, "journal.db")
 
 console = Console()
 
+def load_journal():
+    # Deployments using the SQLite backend (INNERVERSE_STORAGE=sqlite)
+    if os.environ.get("INNERVERSE_STORAGE") == "sqlite" and os.path.exists(DB_PATH):
+        with sqlite3.connect(DB_PATH) as conn:
+            return [json.loads(row[0]) for row in conn.execute("SELECT data FROM entries ORDER BY id")]
+
+    # The journal is an append-only log with one JSON entry per line.
+    # Fall back to the old single-array file if it hasn't been migrated yet.
+    if not os.path.exists(FILE_PATH):
+        with open(LEGACY_FILE_PATH, "r") as file:
+            return json.load(file)
+
+    history = []
+    with open(FILE_PATH, "r", encoding="utf-8") as file:
+        for line in file:
+            try:
+                history.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return history
+
 def display_emotional_forecast():
     try:
-        with open(FILE_PATH, "r") as file:
-            history = json.load(file)
+        history = load_journal()
     except (FileNotFoundError, json.JSONDecodeError):
         console.print("[bold red]No history found yet. Start journaling to see your forecast![/bold red]")
         return
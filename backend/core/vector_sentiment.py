@@ -0,0 +1,316 @@
+"""
+FILE: vector_sentiment.py
+PURPOSE: Array-based alternative to TextBlob's sentiment scoring. The same
+         polarity lexicon is loaded once into NumPy arrays and whole texts
+         (or whole batches of texts) are scored with vectorized lookups.
+NOTES:
+- Enable with INNERVERSE_SENTIMENT_ENGINE=vector (see engine.py); NumPy is
+  optional, and without it the engine stays on TextBlob
+- Follows TextBlob's word-by-word rules with whole-array operations:
+  modifiers ("very good", "really is a good"), negation ("not a good",
+  "not very good", "really not bad"), "!" boosts and the average over
+  assessed chunks. Emoticons and TextBlob's exact tokenizer quirks are not
+  reproduced, so a few texts score differently; run this file for the
+  agreement report and benchmark
+- The ALL CAPS / "!!!" boosters are applied by engine.py, as for TextBlob
+"""
+
+import re
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Lowercased words, "!" and "..." (other punctuation never changes a score).
+# Apostrophes split words, roughly the way TextBlob's tokenizer does.
+TOKEN = re.compile(r"[^\W_]+(?:-[^\W_]+)*|!|\.\.\.")
+
+# Placed between texts in a batch; long enough to end any pending rule
+_SEPARATOR = "<//>"
+
+
+def available():
+    """True if NumPy is installed."""
+    return np is not None
+
+
+class VectorSentiment:
+    """
+    TextBlob's polarity lexicon as arrays.
+
+    Usage:
+        scorer = VectorSentiment()
+        scorer.polarity("not a good day")        -> float
+        scorer.polarity_batch(["...", "..."])    -> numpy array
+    """
+
+    def __init__(self):
+        if np is None:
+            raise ImportError("NumPy is required for the vector sentiment engine")
+
+        from textblob.en import sentiment as pattern
+
+        entries = sorted((word, tags[None]) for word, tags in pattern.items() if None in tags)
+        words = [word for word, _ in entries]
+        modifiers = set(
+            word for word, tags in pattern.items()
+            if any(tag in tags for tag in pattern.modifiers)
+        )
+
+        self.words = np.array(words)
+        self.polarities = np.array([values[0] for _, values in entries], dtype=np.float64)
+        self.intensities = np.array([values[2] for _, values in entries], dtype=np.float64)
+        self.is_modifier = np.array([word in modifiers for word in words], dtype=bool)
+        self.is_negation = np.array([word in pattern.negations for word in words], dtype=bool)
+
+        self._negations = set(pattern.negations)
+
+    # --------------------------------------------------------
+    # Scoring
+    # --------------------------------------------------------
+
+    def polarity(self, text):
+        """Polarity of one text, from -1.0 to 1.0 (0.0 if nothing is assessed)."""
+        return float(self.polarity_batch([text])[0])
+
+    def polarity_batch(self, texts):
+        """
+        Scores many texts in one vectorized pass.
+
+        Returns:
+            numpy.ndarray: One polarity per text
+        """
+        tokens = []
+        doc_ids = []
+        for doc, text in enumerate(texts):
+            found = TOKEN.findall(text.lower())
+            tokens.extend(found)
+            doc_ids.extend([doc] * len(found))
+            # Separator that ends any pending modifier or negation
+            tokens.append(_SEPARATOR)
+            doc_ids.append(doc)
+
+        count = len(texts)
+        if count == 0:
+            return np.zeros(0)
+
+        tokens = np.array(tokens)
+        doc_ids = np.array(doc_ids)
+        positions = np.arange(len(tokens))
+
+        # Vocabulary lookup: binary search in the sorted word array
+        index = np.searchsorted(self.words, tokens)
+        index[index == len(self.words)] = 0
+        known = self.words[index] == tokens
+        index[~known] = 0
+
+        polarity = np.where(known, self.polarities[index], 0.0)
+        intensity = self.intensities[index]
+        modifier = known & self.is_modifier[index]
+        ly_modifier = modifier & np.char.endswith(tokens, "ly")
+        negation = np.isin(tokens, list(self._negations))
+        unknown = ~known
+        length = np.char.str_len(tokens)
+        # Unknown words that end a pending modifier / negation
+        drops_modifier = _counter(unknown & (length > 2))
+        drops_modifier_ly = _counter(unknown & (length > 2) & ~negation)
+        drops_negation = _counter(unknown & ~negation & (np.char.str_len(np.char.strip(tokens, "'")) > 1))
+
+        latest_known = np.maximum.accumulate(np.where(known, positions, -1))
+        latest_negation = np.maximum.accumulate(np.where(negation, positions, -1))
+        next_negation = np.minimum.accumulate(np.where(negation, positions, len(tokens))[::-1])[::-1]
+
+        words = np.flatnonzero(known)
+        previous = np.full(len(words), -1)
+        previous[1:] = words[:-1]
+        has_previous = previous >= 0
+        prev = np.maximum(previous, 0)
+
+        # Is the previous known word still a pending modifier here? ("very good",
+        # "really is a good"); "-ly" modifiers also survive a negation
+        modifier_alive = has_previous & modifier[prev] & np.where(
+            ly_modifier[prev],
+            _count_between(drops_modifier_ly, previous, words) == 0,
+            _count_between(drops_modifier, previous, words) == 0
+        )
+
+        # "really not ...": a negation right after an -ly modifier negates the
+        # modifier's own chunk instead of the next word
+        following = np.append(words[1:], len(tokens))
+        first_negation = next_negation[np.minimum(words + 1, len(tokens) - 1)]
+        negates_own = (
+            ly_modifier[words] & (first_negation > words) & (first_negation < following)
+            & (_count_between(drops_modifier_ly, words, first_negation) == 0)
+        )
+
+        # Negation still pending when this word arrives ("not good", "not a good")
+        last_negation = latest_negation[np.maximum(words - 1, 0)]
+        pending = (
+            (words > 0) & (last_negation > previous)
+            & (_count_between(drops_negation, last_negation, words) == 0)
+        )
+        consumed = (
+            has_previous & ly_modifier[prev]
+            & (_count_between(drops_modifier_ly, previous, last_negation) == 0)
+        )
+        pending &= ~consumed
+
+        # Chunks: a word joins the previous word's chunk while its modifier is alive
+        starts = ~modifier_alive
+        chunk = np.cumsum(starts) - 1
+        chunk_count = int(starts.sum())
+
+        # A negated word divides the next word's intensity instead ("not very good")
+        factor = np.where(pending, 1.0 / intensity[words], intensity[words])
+        value = polarity[words].copy()
+        joined = np.flatnonzero(modifier_alive)
+        value[joined] = np.clip(value[joined] * factor[joined - 1], -1.0, 1.0)
+
+        # Each chunk takes the value of its last word
+        last = np.append(np.flatnonzero(starts)[1:], len(words))[:chunk_count] - 1
+        chunk_value = value[last]
+
+        negated = np.zeros(chunk_count, dtype=bool)
+        negated[chunk[pending | negates_own]] = True
+
+        # Every "!" boosts the latest chunk before it (x1.25, same text only),
+        # unless a later word joins that chunk and replaces its value
+        bangs = np.flatnonzero(tokens == "!")
+        boosted = latest_known[bangs]
+        keep = (boosted >= 0) & (doc_ids[np.maximum(boosted, 0)] == doc_ids[bangs])
+        word_of = np.searchsorted(words, boosted[keep])
+        word_of = word_of[last[chunk[word_of]] == word_of]
+        boosts = np.bincount(chunk[word_of], minlength=chunk_count)
+        chunk_value = np.clip(chunk_value * 1.25 ** boosts, -1.0, 1.0)
+
+        # "not good" is slightly bad
+        chunk_value = np.where(negated, chunk_value * -0.5, chunk_value)
+        first = words[np.flatnonzero(starts)]
+
+        # Average per text
+        chunk_doc = doc_ids[first]
+        totals = np.bincount(chunk_doc, weights=chunk_value, minlength=count)
+        counts = np.bincount(chunk_doc, minlength=count)
+        return totals / np.maximum(counts, 1)
+
+
+
+def _counter(flags):
+    """Prefix sums of `flags`, with a leading 0, for _count_between()."""
+    return np.concatenate(([0], np.cumsum(flags)))
+
+
+def _count_between(counter, after, before):
+    """How many flagged tokens lie strictly between positions `after` and `before`."""
+    return np.maximum(counter[np.maximum(before, 0)] - counter[after + 1], 0)
+
+
+# ============================================================
+# TESTING INTERFACE - Agreement report and benchmark
+# ============================================================
+
+SAMPLE_ENTRIES = [
+    "Today was a good day. I finally finished the project and I feel proud.",
+    "I am so angry right now, nobody listens to me!!!",
+    "Not a great week. Work was stressful and I barely slept.",
+    "I can't stop worrying about the exam tomorrow.",
+    "Had a lovely dinner with friends, really happy and grateful.",
+    "Everything feels heavy. I'm tired of being tired.",
+    "It wasn't bad, just not very exciting either.",
+    "I HATE THIS SO MUCH",
+    "Quiet morning. Coffee, a book, some rain outside.",
+    "My sister called and we laughed for an hour! Best part of the day!",
+    "I feel empty and I don't know why.",
+    "Pretty good session at the gym, though my back hurts a little.",
+    "Never been this nervous before a presentation.",
+    "The new job is amazing so far, everyone is kind.",
+    "I'm overwhelmed, there's too much to do and not enough time.",
+    "Nothing special happened. Just an ordinary, boring day.",
+]
+
+
+def agreement_report(texts, scorer=None):
+    """
+    Compares VectorSentiment with TextBlob on `texts`.
+
+    Returns:
+        dict: Sizes, exact/sign agreement, mean and max absolute difference
+    """
+    from textblob import TextBlob
+
+    scorer = scorer or VectorSentiment()
+    expected = np.array([TextBlob(text).sentiment.polarity for text in texts])
+    actual = scorer.polarity_batch(texts)
+    diff = np.abs(actual - expected)
+
+    return {
+        "texts": len(texts),
+        "exact": float(np.mean(diff < 1e-9)),
+        "same_sign": float(np.mean(np.sign(actual) == np.sign(expected))),
+        "within_0.05": float(np.mean(diff <= 0.05)),
+        "mean_abs_diff": float(diff.mean()),
+        "max_abs_diff": float(diff.max()),
+        "correlation": float(np.corrcoef(actual, expected)[0, 1])
+    }
+
+
+def _random_entries(count, seed=3):
+    """Journal-like texts built from the samples and TextBlob's own vocabulary."""
+    import random
+    from textblob.en import sentiment as pattern
+
+    rng = random.Random(seed)
+    vocabulary = list(pattern.keys())
+    filler = ["i", "am", "the", "day", "was", "a", "it", "and", "feel", "not", "never",
+              "very", "really", "so", "!", ".", "work", "home", "no", "today"]
+    entries = []
+    for _ in range(count):
+        words = [rng.choice(vocabulary) if rng.random() < 0.3 else rng.choice(filler)
+                 for _ in range(rng.randint(3, 40))]
+        entries.append(rng.choice(SAMPLE_ENTRIES) + " " + " ".join(words))
+    return entries
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+    import time
+
+    if np is None:
+        print("NumPy is not installed; the vector sentiment engine is unavailable.")
+        sys.exit(1)
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    scorer = VectorSentiment()
+    entries = _random_entries(count)
+
+    print("=" * 60)
+    print("    VECTOR SENTIMENT - AGREEMENT WITH TEXTBLOB")
+    print("=" * 60)
+    print("Sample entries:", json.dumps(agreement_report(SAMPLE_ENTRIES, scorer), indent=2))
+    print("Random entries:", json.dumps(agreement_report(entries, scorer), indent=2))
+
+    print("=" * 60)
+    print("    BENCHMARK")
+    print("=" * 60)
+    from textblob import TextBlob
+
+    start = time.perf_counter()
+    for text in entries:
+        TextBlob(text).sentiment.polarity
+    textblob_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for text in entries:
+        scorer.polarity(text)
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scorer.polarity_batch(entries)
+    batch_time = time.perf_counter() - start
+
+    print(f"TextBlob, one at a time: {count / textblob_time:10.0f} texts/s")
+    print(f"Vector, one at a time:   {count / single_time:10.0f} texts/s ({textblob_time / single_time:.1f}x)")
+    print(f"Vector, one batch:       {count / batch_time:10.0f} texts/s ({textblob_time / batch_time:.1f}x)")
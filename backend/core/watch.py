@@ -0,0 +1,100 @@
+"""
+FILE: watch.py
+PURPOSE: Config files that are compiled once and swapped in whole when they
+         change on disk (rules.json, lexicon.json).
+NOTES:
+- Read-copy-update: readers take `.current` and keep using that object
+  for as long as they need it; a reload compiles the new version on the
+  watcher thread and replaces the reference in one assignment. Readers
+  never take a lock and never wait for a reload
+- A broken edit is logged and the previous version stays in force
+- Threads don't survive a fork, so every forked process (analysis pool
+  workers) starts its own watcher
+"""
+
+import os
+import threading
+import time
+import weakref
+
+from logs import get_logger
+from utils.atomic import file_version
+
+LOG = get_logger("watch")
+
+# Seconds between checks of a watched file for changes
+RELOAD_INTERVAL = 2.0
+
+
+class WatchedFile:
+    """
+    A file and its compiled form, reloaded when the file changes.
+
+    Args:
+        path: The file
+        load: load(path) -> compiled object; raises OSError or ValueError
+              if the file can't be used
+        name: Used in log events ("<name>_reloaded", "<name>_reload_failed")
+    """
+
+    def __init__(self, path, load, name, reload_interval=RELOAD_INTERVAL):
+        self.path = path
+        self.load = load
+        self.name = name
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._version = file_version(path)
+        self.current = load(path)  # replaced whole, never changed in place
+        self._thread = None
+        _instances.add(self)
+
+    def start(self):
+        """Starts watching the file (a daemon thread; safe to call again)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._watch, name=f"{self.name}-watch", daemon=True)
+            self._thread.start()
+        return self
+
+    def reload(self):
+        """
+        Loads the file now.
+
+        Returns:
+            bool: True if a new version is in force
+        """
+        with self._lock:
+            version = file_version(self.path)
+            try:
+                compiled = self.load(self.path)
+            except (OSError, ValueError) as e:
+                LOG.error(f"{self.name}_reload_failed", path=str(self.path), error=str(e))
+                self._version = version  # don't retry until the file changes again
+                return False
+            self.current, self._version = compiled, version
+        LOG.info(f"{self.name}_reloaded", path=str(self.path), version=getattr(compiled, "version", None))
+        return True
+
+    def _watch(self):
+        while True:
+            time.sleep(self.reload_interval)
+            if file_version(self.path) != self._version:
+                self.reload()
+
+    def _after_fork(self):
+        # A lock held by a parent thread at fork time would stay held forever
+        self._lock = threading.Lock()
+        if self._thread is not None:
+            self._thread = None
+            self.start()
+
+
+_instances = weakref.WeakSet()
+
+
+def _restart_in_child():
+    for watched in list(_instances):
+        watched._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_in_child)